@@ -2,6 +2,19 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections go to the support chat in
+core.chat, which also handles the server's lifespan events.
+
+This is the production run mode (see Procfile):
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w ${WEB_CONCURRENCY:-4}
+
+The public read pages are async views and the middleware stack is async
+capable, so a request waiting on the database or a slow client holds no
+thread. Run a worker per core: the support chat relays messages between
+worker processes through the database (see core.chat).
+`manage.py loadtest` compares this against the sync deployment,
+`gunicorn config.wsgi` with the same number of workers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +25,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Django runs each ASGI request's sync code in a fresh thread, so a persistent
+# connection would never be reused, only left open. Production therefore
+# connects per request; see DATABASES in settings
+os.environ.setdefault('CONN_MAX_AGE', '0')
+
+django_application = get_asgi_application()
+
+from core import chat  # noqa: E402  (needs the app registry loaded above)
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await chat.websocket(scope, receive, send)
+    if scope['type'] == 'lifespan':
+        return await chat.lifespan(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,12 @@ environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
 SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG')
 GEMINI_API_KEY = env('GEMINI_API_KEY', default='')
+# Review digests (core/summaries.py); without a key they come from the offline stub
+REVIEW_SUMMARY_BACKEND = env(
+    'REVIEW_SUMMARY_BACKEND',
+    default='core.summaries.GeminiClient' if GEMINI_API_KEY else 'core.summaries.StubClient',
+)
+REVIEW_SUMMARY_MODEL = env('REVIEW_SUMMARY_MODEL', default='gemini-2.0-flash')
 
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'yanex.pythonanywhere.com', 'yanex66.pythonanywhere.com', '.onrender.com']
 
@@ -38,22 +44,32 @@ SITE_ID = 1
 # 3. MIDDLEWARE
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
 ]
 
+# Per-request SQL/template timing (core.middleware): Server-Timing headers and a slow-request log.
+# The headers show every visitor how long the queries took, so they are off unless DEBUG
+SERVER_TIMING_HEADERS = env.bool('SERVER_TIMING_HEADERS', default=DEBUG)
+REQUEST_BUDGET_MS = env.int('REQUEST_BUDGET_MS', default=500)
+REQUEST_QUERY_BUDGET = env.int('REQUEST_QUERY_BUDGET', default=50)
+# How long a CDN may serve the public item/category pages before revalidating (core.conditional)
+PAGE_CACHE_SECONDS = env.int('PAGE_CACHE_SECONDS', default=60)
+
 ROOT_URLCONF = 'config.urls'
 
 # 4. TEMPLATES
+# Django's own backend, with render time reported by RequestMetricsMiddleware
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.middleware.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,24 +85,95 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # 5. DATABASE
+# SQLite tuned for several concurrent workers: WAL lets readers run alongside
+# the single writer, busy_timeout waits for the write lock instead of raising
+# "database is locked", and IMMEDIATE transactions take that lock up front so a
+# read-then-write transaction can't fail halfway. SQLITE_TUNED=False gives
+# stock sqlite3 behaviour; `manage.py stress_sqlite` compares the two.
+#
+# CONN_MAX_AGE only helps the sync processes (the job worker, management
+# commands, a `config.wsgi` deployment). The production web process is ASGI
+# (Procfile), where config/asgi.py sets it to 0: Django runs each request's
+# sync code in a new thread, so a kept connection would never be reused, and
+# every request connects (and runs the PRAGMAs) afresh.
+SQLITE_TUNED = env.bool('SQLITE_TUNED', default=True)
+SQLITE_BUSY_TIMEOUT_MS = env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',              # durable at checkpoints; safe with WAL
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024),
+    'cache_size': -env.int('SQLITE_CACHE_SIZE_KB', default=32 * 1024),   # negative = KiB
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': env('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': env.int('CONN_MAX_AGE', default=600 if SQLITE_TUNED else 0),
+        'CONN_HEALTH_CHECKS': SQLITE_TUNED,
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        } if SQLITE_TUNED else {},
     }
 }
 
+# Cache shared by every worker process on the host: an SQLite file of its own
+# (core.caching.SQLiteCache). With several hosts, point them all at a network
+# cache instead: CACHE_BACKEND=redis (needs `redis`) or memcached (needs
+# `pymemcache`), with CACHE_LOCATION=<server URL or host:port>. locmem keeps a
+# cache per process. Item card keys change whenever the item does, so old
+# entries are never read again and only age out or get culled; MAX_ENTRIES
+# leaves room for every card of the largest listing.
+CACHE_BACKENDS = {
+    'sqlite': 'core.caching.SQLiteCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+}
+CACHE_BACKEND = env('CACHE_BACKEND', default='sqlite')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': env('CACHE_LOCATION', default=str(BASE_DIR / 'cache.sqlite3')),
+        'KEY_PREFIX': env('CACHE_KEY_PREFIX', default=''),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('CACHE_MAX_ENTRIES', default=20000),
+        } if CACHE_BACKEND in ('sqlite', 'locmem') else {},
+    }
+}
+# Cached category tree (core.views.category_list), refreshed early under load
+CATEGORY_TREE_CACHE_SECONDS = env.int('CATEGORY_TREE_CACHE_SECONDS', default=60 * 10)
+CARD_CACHE_SECONDS = env.int('CARD_CACHE_SECONDS', default=60 * 60 * 24)
+# Home page snapshot (core.homepage): rebuilt by the worker every
+# HOME_SNAPSHOT_SECONDS, served stale for up to HOME_SNAPSHOT_STALE_SECONDS more
+HOME_SNAPSHOT_SECONDS = env.int('HOME_SNAPSHOT_SECONDS', default=60)
+HOME_SNAPSHOT_STALE_SECONDS = env.int('HOME_SNAPSHOT_STALE_SECONDS', default=600)
+HOME_HERO_LIMIT = env.int('HOME_HERO_LIMIT', default=5)
+HOME_HERO_ROTATE_SECONDS = env.int('HOME_HERO_ROTATE_SECONDS', default=60 * 60)
+
 # 6. STATIC & MEDIA
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Minified, content-hashed and pre-compressed by collectstatic (core/storage.py)
+    'staticfiles': {'BACKEND': 'core.storage.MinifiedManifestStaticFilesStorage'},
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Recorded downloads served by the populate commands' --offline mode (core.fetch)
+MEDIA_FIXTURES_DIR = env('MEDIA_FIXTURES_DIR', default=str(BASE_DIR / 'fixtures' / 'media'))
 
 # 7. EMAIL (Securely pulled from .env)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Messages are queued and sent by `manage.py run_worker` through QUEUED_EMAIL_BACKEND
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -116,4 +203,22 @@ SOCIALACCOUNT_LOGIN_ON_GET = True
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 9. LOGGING
+# Slow requests are written as one JSON object per line
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'slow_requests': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+        'core.slow_requests': {'handlers': ['slow_requests'], 'level': 'WARNING', 'propagate': False},
+    },
+}
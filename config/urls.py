@@ -24,7 +24,8 @@ from core.views import (
     about, 
     contact, 
     privacy, 
-    terms
+    terms,
+    support_console,
 )
 
 urlpatterns = [
@@ -68,6 +69,12 @@ urlpatterns = [
     path('contact/', contact, name='contact'),
     path('privacy/', privacy, name='privacy'),
     path('terms/', terms, name='terms'),
+
+    # --- JSON API (read-only catalog) ---
+    path('api/v1/', include('core.api')),
+
+    # --- Live Support (staff) ---
+    path('support/console/', support_console, name='support_console'),
 ]
 
 if settings.DEBUG:
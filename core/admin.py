@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib import messages
-from .models import Category, Item, Review, Profile, Referral, PayoutRequest
+from django.utils import timezone
+from . import payouts
+from .models import Category, Item, Review, Profile, Referral, PayoutRequest, LedgerEntry, Job, ReviewSummary, ReviewerStats
 
 # --- INLINE SETTING ---
 class ItemInline(admin.TabularInline):
@@ -12,7 +14,7 @@ class ItemInline(admin.TabularInline):
 # 1. Customize Category Admin
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'parent', 'slug')
+    list_display = ('name', 'parent', 'slug', 'item_count', 'subtree_item_count')
     search_fields = ('name',)
     prepopulated_fields = {'slug': ('name',)}
     inlines = [ItemInline]
@@ -20,7 +22,7 @@ class CategoryAdmin(admin.ModelAdmin):
 # 2. Customize Item Admin
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'category', 'is_featured', 'created_at')
+    list_display = ('name', 'price', 'category', 'is_featured', 'review_count', 'weighted_rating', 'created_at')
     list_filter = ('category', 'is_featured')
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
@@ -62,6 +64,8 @@ class ProfileAdmin(admin.ModelAdmin):
     formatted_balance.short_description = 'Wallet Balance (Spendable)'
 
     fields = ('user', 'image', 'token_rewards', 'balance')
+    # Balances are a projection of the ledger; see core.wallet and verify_ledger
+    readonly_fields = ('token_rewards', 'balance')
 
 # 5. Customize Referral Admin
 @admin.register(Referral)
@@ -78,16 +82,29 @@ class PayoutRequestAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'account_number', 'account_name')
     list_editable = ('status',)
     
-    actions = ['mark_as_paid']
+    actions = ['mark_as_processing', 'mark_as_paid', 'cancel_and_refund']
+
+    def _transition(self, request, queryset, target):
+        batches = payouts.transition(queryset, target)
+        moved = sum(batch.moved for batch in batches)
+        refunded = sum(batch.refunded for batch in batches)
+        seconds = sum(batch.seconds for batch in batches)
+        message = f"Successfully marked {moved} requests as {target} in {len(batches)} batches ({seconds:.2f}s)."
+        if refunded:
+            message += f" Refunded {refunded} wallets."
+        self.message_user(request, message, messages.SUCCESS)
+
+    @admin.action(description="Mark selected requests as PROCESSING")
+    def mark_as_processing(self, request, queryset):
+        self._transition(request, queryset, 'PROCESSING')
 
     @admin.action(description="Mark selected requests as PAID")
     def mark_as_paid(self, request, queryset):
-        updated = queryset.update(status='PAID')
-        self.message_user(
-            request, 
-            f"Successfully marked {updated} requests as PAID.", 
-            messages.SUCCESS
-        )
+        self._transition(request, queryset, 'PAID')
+
+    @admin.action(description="Cancel selected requests and refund wallets")
+    def cancel_and_refund(self, request, queryset):
+        self._transition(request, queryset, 'CANCELLED')
 
     def current_wallet_balance(self, obj):
         return f"₦{obj.user.profile.balance:,.2f}"
@@ -102,4 +119,67 @@ class PayoutRequestAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ('current_wallet_balance', 'created_at')
\ No newline at end of file
+    readonly_fields = ('current_wallet_balance', 'created_at')
+
+# 7. Read-only Ledger Admin
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'account', 'kind', 'amount', 'reference', 'created_at')
+    list_filter = ('account', 'kind', 'created_at')
+    search_fields = ('user__username', 'reference')
+    list_select_related = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# 8. Background Job Admin
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('payload', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected jobs now")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status='RUNNING').update(
+            status='QUEUED', attempts=0, run_at=timezone.now(), locked_by='', finished_at=None
+        )
+        self.message_user(request, f"Requeued {updated} jobs.", messages.SUCCESS)
+
+# 9. Review Digest Admin
+@admin.register(ReviewSummary)
+class ReviewSummaryAdmin(admin.ModelAdmin):
+    list_display = ('item', 'review_count', 'backend', 'stale', 'generated_at')
+    list_filter = ('stale', 'backend')
+    search_fields = ('item__name',)
+    list_select_related = ('item',)
+    readonly_fields = ('review_hash', 'review_count', 'backend', 'generated_at')
+    actions = ['mark_stale']
+
+    @admin.action(description="Regenerate on the next summary run")
+    def mark_stale(self, request, queryset):
+        # Clearing the hash forces a new digest even if the reviews are unchanged
+        updated = queryset.update(stale=True, review_hash='')
+        self.message_user(request, f"Flagged {updated} summaries.", messages.SUCCESS)
+
+# 10. Read-only Reviewer Stats Admin
+@admin.register(ReviewerStats)
+class ReviewerStatsAdmin(admin.ModelAdmin):
+    # Maintained by signals; fix drift with `manage.py rebuild_reviewer_stats`
+    list_display = ('user', 'review_count', 'avg_rating', 'referral_count', 'last_review_at')
+    search_fields = ('user__username',)
+    list_select_related = ('user',)
+    ordering = ('-review_count',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,284 @@
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.http import require_safe
+
+from .models import Category, Item, Review
+from .pagination import changed_page, encode_cursor, keyset_page
+from .search import search_items
+
+# Read-only JSON catalog for mobile and partner clients, mounted at /api/v1/.
+#
+#   categories/                     every category, in tree order
+#   items/?category=<slug>          items newest first, optionally one category subtree
+#   items/<slug>/                   one item, with its review digest
+#   items/<slug>/reviews/           an item's reviews, newest first
+#   search/?q=<text>                relevance-ranked items
+#
+# Lists return {"results": [...], "next": url, "newer": url}. `next` pages
+# towards older rows. The first page's `newer` is a sync cursor (`?since=`)
+# on (updated_at, pk): it returns the rows added or edited since that page
+# was read, oldest change first, with a `newer` of its own to follow until a
+# page comes back empty, and to poll from then on. `?fields=a,b`
+# limits each object to those keys (and the columns loaded to what they
+# need), `?limit=` sets the page size. Every response carries an ETag and an
+# unchanged page answers If-None-Match with 304.
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def _decimal(value):
+    return str(value) if value is not None else None
+
+
+def _datetime(value):
+    return value.isoformat() if value is not None else None
+
+
+# api field -> (model fields it reads, how to render it)
+CATEGORY_FIELDS = {
+    'id': ((), lambda c: c.pk),
+    'slug': (('slug',), lambda c: c.slug),
+    'name': (('name',), lambda c: c.name),
+    'parent': (('parent',), lambda c: c.parent_id),
+    'depth': (('depth',), lambda c: c.depth),
+    'item_count': (('item_count',), lambda c: c.item_count),
+    'subtree_item_count': (('subtree_item_count',), lambda c: c.subtree_item_count),
+    'icon': (('icon',), lambda c: c.icon.url if c.icon else None),
+}
+
+ITEM_FIELDS = {
+    'id': ((), lambda i: i.pk),
+    'slug': (('slug',), lambda i: i.slug),
+    'name': (('name',), lambda i: i.name),
+    'url': (('slug',), lambda i: reverse('item_detail', args=[i.slug])),
+    'category': (('category__slug',), lambda i: i.category.slug),
+    'description': (('description',), lambda i: i.description),
+    'price': (('price',), lambda i: _decimal(i.price)),
+    'discount_price': (('discount_price',), lambda i: _decimal(i.discount_price)),
+    'website': (('website',), lambda i: i.website),
+    'affiliate_link': (('affiliate_link',), lambda i: i.affiliate_link),
+    'image': (('image',), lambda i: i.image.url if i.image else None),
+    'specifications': (('specifications',), lambda i: i.specifications),
+    'is_featured': (('is_featured',), lambda i: i.is_featured),
+    'review_count': (('review_count',), lambda i: i.review_count),
+    'avg_rating': (('review_count', 'rating_sum'), lambda i: i.avg_rating),
+    'weighted_rating': (('weighted_rating',), lambda i: i.weighted_rating),
+    'created_at': (('created_at',), lambda i: _datetime(i.created_at)),
+    'updated_at': (('updated_at',), lambda i: _datetime(i.updated_at)),
+}
+
+
+def _summary(item):
+    summary = getattr(item, 'summary', None)
+    if summary is None:
+        return None
+    return {
+        'summary': summary.summary,
+        'pros': summary.pros,
+        'cons': summary.cons,
+        'review_count': summary.review_count,
+        'generated_at': _datetime(summary.generated_at),
+    }
+
+
+ITEM_DETAIL_FIELDS = {
+    **ITEM_FIELDS,
+    'summary': (
+        ('summary__summary', 'summary__pros', 'summary__cons', 'summary__review_count', 'summary__generated_at'),
+        _summary,
+    ),
+}
+
+REVIEW_FIELDS = {
+    'id': ((), lambda r: r.pk),
+    'author': (('author__username',), lambda r: r.author.username),
+    'rating': (('rating',), lambda r: r.rating),
+    'title': (('title',), lambda r: r.title),
+    'content': (('content',), lambda r: r.content),
+    'is_featured': (('is_featured',), lambda r: r.is_featured),
+    'created_at': (('created_at',), lambda r: _datetime(r.created_at)),
+    'updated_at': (('updated_at',), lambda r: _datetime(r.updated_at)),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def api_view(view):
+    """GET/HEAD only; JSON errors; ETag + If-None-Match on every response."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            payload = view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return JsonResponse({'detail': str(exc)}, status=400)
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        response = JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
+        set_response_etag(response)
+        return get_conditional_response(request, etag=response.headers['ETag'], response=response)
+    return wrapper
+
+
+# --- REQUEST PARSING ---
+
+def requested_fields(request, available):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}")
+    return fields
+
+
+def requested_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be a whole number')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def only_columns(queryset, available, fields, always=()):
+    """Load only the columns behind `fields` (plus `always`, e.g. the cursor columns), joining what they traverse."""
+    columns = set(always)
+    for name in fields:
+        columns.update(available[name][0])
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only('pk', *columns)
+
+
+def serialize(obj, available, fields):
+    return {name: available[name][1](obj) for name in fields}
+
+
+def page_url(request, **params):
+    query = request.GET.copy()
+    for key in ('after', 'since'):
+        query.pop(key, None)
+    query.update(params)
+    return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+
+def cursor_list(request, queryset, available, always=()):
+    """A keyset page of `queryset` as the list payload: newest first, or the changes since `?since=`."""
+    fields = requested_fields(request, available)
+    queryset = only_columns(queryset, available, fields, always=('created_at', 'updated_at', *always))
+    limit = requested_limit(request)
+    since = request.GET.get('since')
+    if since:
+        try:
+            rows = changed_page(queryset, limit, since).object_list
+        except ValueError:
+            raise BadRequest('since is not a valid cursor')
+        return {
+            'results': [serialize(obj, available, fields) for obj in rows],
+            'next': None,
+            # Nothing changed yet: poll the same cursor again
+            'newer': page_url(request, since=encode_cursor(rows[-1], 'updated_at')) if rows
+                     else request.build_absolute_uri(),
+        }
+
+    page = keyset_page(queryset, limit, after=request.GET.get('after'))
+    rows = page.object_list
+    newer = None
+    if rows and not request.GET.get('after'):
+        # Sync from the latest change on the first page: anything changed after
+        # it was read, on any page, sorts past that
+        latest = max(rows, key=lambda obj: (obj.updated_at, obj.pk))
+        newer = page_url(request, since=encode_cursor(latest, 'updated_at'))
+    return {
+        'results': [serialize(obj, available, fields) for obj in rows],
+        'next': page_url(request, after=page.next_cursor) if page.has_next else None,
+        'newer': newer,
+    }
+
+
+# --- ENDPOINTS ---
+
+@api_view
+def category_list(request):
+    fields = requested_fields(request, CATEGORY_FIELDS)
+    categories = only_columns(Category.objects.order_by('path'), CATEGORY_FIELDS, fields, always=('path',))
+    # Paged on the materialized path, which is unique and indexed
+    after = request.GET.get('after')
+    if after:
+        categories = categories.filter(path__gt=after)
+    limit = requested_limit(request)
+    rows = list(categories[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'results': [serialize(category, CATEGORY_FIELDS, fields) for category in rows],
+        'next': page_url(request, after=rows[-1].path) if more else None,
+    }
+
+
+@api_view
+def item_list(request):
+    items = Item.objects.all()
+    slug = request.GET.get('category')
+    if slug:
+        category = get_object_or_404(Category.objects.only('path'), slug=slug)
+        items = category.subtree_items()
+    return cursor_list(request, items, ITEM_FIELDS)
+
+
+@api_view
+def item_detail(request, slug):
+    fields = requested_fields(request, ITEM_DETAIL_FIELDS)
+    item = get_object_or_404(only_columns(Item.objects.all(), ITEM_DETAIL_FIELDS, fields), slug=slug)
+    return serialize(item, ITEM_DETAIL_FIELDS, fields)
+
+
+@api_view
+def review_list(request, slug):
+    item_id = get_object_or_404(Item.objects.only('pk'), slug=slug).pk
+    reviews = Review.objects.filter(item_id=item_id)
+    return cursor_list(request, reviews, REVIEW_FIELDS)
+
+
+@api_view
+def search(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        raise BadRequest('q is required')
+    fields = requested_fields(request, {**ITEM_FIELDS, 'snippet': None})
+    item_fields = [name for name in fields if name != 'snippet']
+    limit = requested_limit(request)
+    # Relevance order has no stable key to seek on, so the cursor is an offset
+    try:
+        offset = max(int(request.GET.get('after', 0)), 0)
+    except ValueError:
+        raise BadRequest('after must be a whole number')
+    rows = search_items(query)[offset:offset + limit + 1]
+    results = []
+    for item in rows[:limit]:
+        data = serialize(item, ITEM_FIELDS, item_fields)
+        if 'snippet' in fields:
+            data['snippet'] = str(getattr(item, 'snippet', ''))
+        results.append(data)
+    return {
+        'results': results,
+        'next': page_url(request, after=offset + limit) if len(rows) > limit else None,
+    }
+
+
+urlpatterns = [
+    path('categories/', category_list, name='api_category_list'),
+    path('items/', item_list, name='api_item_list'),
+    path('items/<slug:slug>/', item_detail, name='api_item_detail'),
+    path('items/<slug:slug>/reviews/', review_list, name='api_review_list'),
+    path('search/', search, name='api_search'),
+]
@@ -0,0 +1,305 @@
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# The shared cache tier. SQLiteCache keeps entries in an SQLite file that every
+# worker process on the host opens, so they share what one of them computed;
+# multi-host deployments point CACHES at Redis or memcached instead (see
+# settings). On top of whichever backend is configured:
+#
+#   namespaced_key('category', 'roots')   keys that all go stale at once when
+#   bump_namespace('category')            something in the namespace changes
+#
+#   get_or_compute(key, compute, timeout) a cached value that is recomputed by
+#                                         one caller at a time: on a miss the
+#                                         others wait for it, and before expiry
+#                                         a caller may refresh it early (XFetch),
+#                                         so a hot key never expires under load
+#
+#   single_flight(key, build)             the miss half of that, for values that
+#                                         are stored by `build` itself
+
+LOCK_SECONDS = 30          # a lock older than this belongs to a caller that died
+LOCK_WAIT_SECONDS = 5      # how long a caller waits for someone else's result
+LOCK_POLL_SECONDS = 0.05
+XFETCH_BETA = 1.0          # > 1 refreshes earlier, < 1 later
+
+
+# --- SQLITE BACKEND ---
+
+class _ConnectionPool:
+    """
+    Idle connections to one cache file, shared by every thread of a process.
+    Django builds a cache instance per thread (and per async context), so the
+    connections and the schema check live here, once per file and process,
+    rather than on the instance.
+    """
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self.writes = 0            # approximate across threads; it only paces culling
+        self._idle = []
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        db.execute('PRAGMA synchronous=NORMAL')
+        with self._schema_lock:
+            if not self._schema_ready:
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)')
+                db.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+                self._schema_ready = True
+        return db
+
+    @contextmanager
+    def connection(self):
+        try:
+            db = self._idle.pop()
+        except IndexError:
+            db = self._connect()
+        try:
+            yield db
+        finally:
+            self._idle.append(db)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(path, timeout):
+    # Keyed by pid too: a forked child must not share its parent's connections
+    key = (os.getpid(), path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = _ConnectionPool(path, timeout)
+        return _pools[key]
+
+
+class SQLiteCache(BaseCache):
+    """
+    A cache in its own SQLite file (LOCATION), separate from the main database
+    so cache writes never wait on the application's write lock.
+
+        'BACKEND': 'core.caching.SQLiteCache', 'LOCATION': '/srv/vouchly/cache.sqlite3'
+    """
+    busy_timeout = 5.0
+    cull_check_every = 200   # writes between two checks of the entry count
+    batch_size = 500         # keys per statement in get_many / delete_many
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+
+    def _db(self):
+        return _pool(self._path, self.busy_timeout).connection()
+
+    def _wrote(self, count=1):
+        pool = _pool(self._path, self.busy_timeout)
+        pool.writes += count
+        if pool.writes >= self.cull_check_every:
+            pool.writes = 0
+            self._cull()
+
+    def _cull(self):
+        with self._db() as db:
+            db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            (count,) = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+            if count > self._max_entries:
+                # Back under MAX_ENTRIES, less another 1/CULL_FREQUENCY of it; soonest
+                # to expire first, entries without an expiry last
+                headroom = self._max_entries // self._cull_frequency if self._cull_frequency else self._max_entries
+                db.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                    (count - self._max_entries + headroom,),
+                )
+
+    @staticmethod
+    def _batches(keys, size):
+        for start in range(0, len(keys), size):
+            yield keys[start:start + size]
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._db() as db:
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+            ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = {}
+        now = time.time()
+        with self._db() as db:
+            for batch in self._batches(list(names), self.batch_size):
+                rows = db.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({', '.join('?' * len(batch))}) "
+                    'AND (expires IS NULL OR expires > ?)',
+                    (*batch, now),
+                )
+                found.update((names[key], pickle.loads(value)) for key, value in rows)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._db() as db:
+            db.execute(
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout)),
+            )
+        self._wrote()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self.make_and_validate_key(key, version=version), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            for key, value in data.items()
+        ]
+        with self._db() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.executemany(
+                    'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+                    rows,
+                )
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+        self._wrote(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Atomic: only a missing or expired entry is replaced
+        key = self.make_and_validate_key(key, version=version)
+        with self._db() as db:
+            added = db.execute(
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+                'WHERE cache.expires <= ?',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout), time.time()),
+            ).rowcount
+        self._wrote()
+        return added == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._db() as db:
+            return db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._db() as db:
+            return db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        names = [self.make_and_validate_key(key, version=version) for key in keys]
+        with self._db() as db:
+            for batch in self._batches(names, self.batch_size):
+                db.execute(f"DELETE FROM cache WHERE key IN ({', '.join('?' * len(batch))})", batch)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._db() as db:
+            return db.execute(
+                'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+            ).fetchone() is not None
+
+    def clear(self):
+        with self._db() as db:
+            db.execute('DELETE FROM cache')
+
+
+# --- NAMESPACES ---
+
+def namespace_version(name):
+    # A timestamp rather than a counter: if the version entry is ever evicted,
+    # a counter restarting at 1 would bring old entries back to life
+    key = f'ns:{name}'
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def namespaced_key(name, key):
+    return f'{name}:{namespace_version(name)}:{key}'
+
+
+def bump_namespace(name):
+    """Make every key built with namespaced_key(name, ...) miss from now on."""
+    cache.set(f'ns:{name}', time.time_ns(), None)
+
+
+# --- STAMPEDE PROTECTION ---
+
+def single_flight(key, build):
+    """
+    Let one caller run `build()`, which stores the value under `key` and
+    returns it; callers arriving meanwhile wait for that value instead of
+    building their own, unless it takes longer than LOCK_WAIT_SECONDS.
+    """
+    lock = f'{key}:lock'
+    if cache.add(lock, True, LOCK_SECONDS):
+        try:
+            return build()
+        finally:
+            cache.delete(lock)
+
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
+
+
+def get_or_compute(key, compute, timeout, beta=XFETCH_BETA):
+    """
+    `compute()`, cached for `timeout` seconds. Each hit may refresh the value
+    early, with a probability that grows as expiry nears and with how long
+    `compute` took last time (XFetch), so it is usually replaced before it
+    expires; only one caller refreshes or fills it at a time.
+    """
+    def recompute():
+        started = time.monotonic()
+        value = compute()
+        took = time.monotonic() - started
+        entry = (value, took, time.time() + timeout)
+        cache.set(key, entry, timeout)
+        return entry
+
+    entry = cache.get(key)
+    if entry is None:
+        return single_flight(key, recompute)[0]
+
+    value, took, expires = entry
+    if time.time() - took * beta * math.log(1.0 - random.random()) < expires:
+        return value
+    # Picked to refresh early; if someone already is, keep serving this value
+    if cache.add(f'{key}:lock', True, LOCK_SECONDS):
+        try:
+            return recompute()[0]
+        finally:
+            cache.delete(f'{key}:lock')
+    return value
@@ -0,0 +1,335 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from http.cookies import CookieError, SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import User
+from django.db.models import Max, Q
+from django.http.request import validate_host
+from django.utils import timezone
+
+from .models import ChatMessage
+from .pagination import decode_cursor, encode_cursor
+
+# Live support chat over a raw ASGI WebSocket, routed from config/asgi.py.
+#
+#   /ws/chat/         a signed-in user talking to support (channel "user:<id>")
+#   /ws/chat/staff/   the staff console, which sees every conversation
+#
+# Messages fan out through a hub, so every tab of the user and every staff
+# console gets them without polling. A message reaches the sockets of the
+# process it was typed in at once. The other worker processes find it in the
+# table: each process with open sockets reads the ChatMessage rows past the
+# last one it has seen every RELAY_INTERVAL seconds and publishes those written
+# elsewhere. The site can run as many ASGI workers as it needs. SQLite commits
+# one writer at a time, so ids are committed in order and none is skipped.
+# New messages are buffered and written with one bulk_create every
+# FLUSH_INTERVAL seconds. A message from another worker arrives within about
+# FLUSH_INTERVAL + RELAY_INTERVAL.
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE = 30
+FLUSH_INTERVAL = 0.5      # seconds a message may wait before it is written
+FLUSH_SIZE = 200          # write immediately once this many are waiting
+RELAY_INTERVAL = 0.5      # seconds between two reads of messages from other processes
+RELAY_BATCH = 500
+MAX_LENGTH = 2000
+QUEUE_SIZE = 100          # events buffered per socket before a slow client starts losing them
+STAFF_CHANNEL = 'staff'
+
+CLOSE_FORBIDDEN = 4403
+
+
+class Hub:
+    """Pub/sub: each open socket owns a queue subscribed to one channel."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._relay = None
+        self._seen = None       # the last ChatMessage id relayed, once relaying
+        self._written = set()   # ids written by this process, published when posted
+        # Held while writing or reading messages, so a row this process has
+        # written is always in _written before the relay can see it
+        self.lock = asyncio.Lock()
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[channel].add(queue)
+        if self._relay is None:
+            self._relay = asyncio.get_running_loop().create_task(self.relay())
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        self._subscribers[channel].discard(queue)
+        if not self._subscribers[channel]:
+            del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        for queue in list(self._subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Dropping chat event for a slow client on %s", channel)
+
+    def written(self, messages):
+        self._written.update(message.pk for message in messages)
+
+    async def relay(self):
+        """While any socket is open here, publish the messages other processes write."""
+        try:
+            while self._subscribers:
+                try:
+                    await self.relay_once()
+                except Exception:
+                    logger.exception("Chat relay failed")
+                await asyncio.sleep(RELAY_INTERVAL)
+        finally:
+            self._relay, self._seen = None, None
+
+    async def relay_once(self):
+        async with self.lock:
+            if self._seen is None:  # start from the end of the table
+                messages, self._seen = [], await last_message_id()
+            else:
+                messages = await messages_after(self._seen)
+        for message in messages:
+            self._seen = message.pk
+            if message.pk not in self._written:
+                event = serialize(message)
+                if message.user_id:
+                    self.publish(f"user:{message.user_id}", event)
+                self.publish(STAFF_CHANNEL, event)
+        self._written = {pk for pk in self._written if pk > self._seen}
+
+    async def stop(self):
+        if self._relay is not None:
+            self._relay.cancel()
+            try:
+                await self._relay
+            except asyncio.CancelledError:
+                pass
+
+
+class MessageWriter:
+    """Buffers new ChatMessages and saves them in batches."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    def add(self, message):
+        self._pending.append(message)
+        if len(self._pending) >= FLUSH_SIZE:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(FLUSH_INTERVAL, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            async with self.hub.lock:
+                try:
+                    await sync_to_async(ChatMessage.objects.bulk_create)(batch)
+                except Exception:
+                    logger.exception("Lost %s chat messages", len(batch))
+                else:
+                    self.hub.written(batch)
+
+
+hub = Hub()
+writer = MessageWriter(hub)
+
+
+# --- QUERIES ---
+
+@sync_to_async
+def load_history(user_id, before=None):
+    """One page of a conversation, newest first, keyset-paginated on (created_at, id)."""
+    messages = ChatMessage.objects.filter(user_id=user_id).select_related('user')
+    if before:
+        created_at, pk = decode_cursor(before)
+        messages = messages.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    page = list(messages.order_by('-created_at', '-pk')[:HISTORY_PAGE + 1])
+    more = len(page) > HISTORY_PAGE
+    page = page[:HISTORY_PAGE]
+    return {
+        'type': 'history',
+        'user': user_id,
+        'messages': [serialize(message) for message in page],
+        'next': encode_cursor(page[-1]) if more else None,
+    }
+
+
+@sync_to_async
+def last_message_id():
+    return ChatMessage.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+@sync_to_async
+def messages_after(pk):
+    return list(ChatMessage.objects.filter(pk__gt=pk).select_related('user').order_by('pk')[:RELAY_BATCH])
+
+
+@sync_to_async
+def load_conversations():
+    rows = (
+        ChatMessage.objects.filter(user__isnull=False)
+        .values('user', 'user__username').annotate(last=Max('created_at')).order_by('-last')[:50]
+    )
+    return {
+        'type': 'conversations',
+        'conversations': [
+            {'user': row['user'], 'username': row['user__username'], 'last': row['last'].isoformat()} for row in rows
+        ],
+    }
+
+
+@sync_to_async
+def authenticate(scope):
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            try:
+                cookies.load(value.decode('latin-1'))
+            except CookieError:
+                return None
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_module(settings.SESSION_ENGINE)
+    user = get_user(SimpleNamespace(session=engine.SessionStore(morsel.value)))
+    return user if user.is_authenticated else None
+
+
+def origin_allowed(scope):
+    # Browsers always send Origin on WebSockets; refuse pages from other sites
+    for name, value in scope.get('headers', []):
+        if name == b'origin':
+            host = urlsplit(value.decode('latin-1')).hostname or ''
+            return validate_host(host, settings.ALLOWED_HOSTS)
+    return True
+
+
+def serialize(message, username=None):
+    return {
+        'type': 'message',
+        'user': message.user_id,
+        'username': username or (message.user.username if message.user_id else ''),
+        'text': message.message,
+        'from_staff': message.is_from_admin,
+        'created_at': (message.created_at or timezone.now()).isoformat(),
+    }
+
+
+# --- CONNECTION ---
+
+async def post_message(text, conversation_id, username, from_staff):
+    text = (text or '').strip()[:MAX_LENGTH]
+    if not text:
+        return
+    message = ChatMessage(user_id=conversation_id, message=text, is_from_admin=from_staff)
+    writer.add(message)
+    event = serialize(message, username=username)
+    hub.publish(f"user:{conversation_id}", event)
+    hub.publish(STAFF_CHANNEL, event)
+
+
+async def handle(user, is_console, data, send_json):
+    kind = data.get('type')
+    if is_console:
+        try:
+            conversation_id = int(data.get('user', 0))
+        except (TypeError, ValueError):
+            return
+    else:
+        conversation_id = user.pk
+
+    if kind == 'message':
+        if is_console:
+            username = await User.objects.filter(pk=conversation_id).values_list('username', flat=True).afirst()
+            if username is None:
+                return
+        else:
+            username = user.username
+        await post_message(data.get('text'), conversation_id, username, from_staff=is_console)
+    elif kind == 'history' and conversation_id:
+        await writer.flush()
+        try:
+            await send_json(await load_history(conversation_id, data.get('before')))
+        except ValueError:  # malformed cursor
+            return
+    elif kind == 'conversations' and is_console:
+        await writer.flush()
+        await send_json(await load_conversations())
+
+
+async def websocket(scope, receive, send):
+    if scope['path'].rstrip('/') not in ('/ws/chat', '/ws/chat/staff'):
+        await receive()
+        await send({'type': 'websocket.close'})
+        return
+
+    await receive()  # websocket.connect
+    is_console = scope['path'].rstrip('/').endswith('/staff')
+    user = await authenticate(scope) if origin_allowed(scope) else None
+    await send({'type': 'websocket.accept'})
+    if user is None or (is_console and not user.is_staff):
+        # Accept first so the browser sees our close code and stops reconnecting
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    async def send_json(payload):
+        await send({'type': 'websocket.send', 'text': json.dumps(payload)})
+
+    async def forward(queue):
+        while True:
+            await send_json(await queue.get())
+
+    channel = STAFF_CHANNEL if is_console else f"user:{user.pk}"
+    queue = hub.subscribe(channel)
+    forwarder = asyncio.create_task(forward(queue))
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            try:
+                data = json.loads(event.get('text') or '{}')
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                await handle(user, is_console, data, send_json)
+    finally:
+        forwarder.cancel()
+        hub.unsubscribe(channel, queue)
+
+
+async def lifespan(scope, receive, send):
+    # Django's ASGI handler doesn't speak lifespan; use it to flush buffered messages on shutdown
+    while True:
+        event = await receive()
+        if event['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif event['type'] == 'lifespan.shutdown':
+            await writer.flush()
+            await hub.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,103 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import Category, Item, Review
+
+# Conditional GET for the catalog pages. Each page has a state function that
+# reads, in a query or two, the timestamps and counters of everything the page
+# renders; `condition()` answers a matching If-None-Match / If-Modified-Since
+# with 304 before the view runs any template or aggregate query.
+#
+# Signed-in visitors get a different page (referral link, review form, CSRF
+# token), so their ETag also covers the user and CSRF cookie, they get no
+# Last-Modified, and the response is private. Anonymous pages are public: a
+# CDN may keep them PAGE_CACHE_SECONDS, browsers revalidate every time.
+
+
+async def item_page_state(slug):
+    newest_review = Review.objects.filter(item=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+    row = await (
+        Item.objects.filter(slug=slug)
+        .annotate(newest_review=Subquery(newest_review))
+        .values_list('pk', 'updated_at', 'review_count', 'category__updated_at', 'summary__generated_at', 'newest_review')
+        .afirst()
+    )
+    if row is None:
+        return None
+    pk, updated_at, review_count, category_updated_at, summary_generated_at, newest_review = row
+    return row, max(filter(None, (updated_at, category_updated_at, summary_generated_at, newest_review)))
+
+
+async def category_page_state(slug):
+    row = await Category.objects.filter(slug=slug).values_list('pk', 'path', 'updated_at', 'subtree_item_count').afirst()
+    if row is None:
+        return None
+    # An edited, re-rated or moved item anywhere in the subtree changes the listing
+    newest_item = (await Item.objects.filter(Category.subtree_range(row[1], prefix='category__')).aaggregate(
+        newest=Max('updated_at')
+    ))['newest']
+    return (*row, newest_item), max(filter(None, (row[2], newest_item)))
+
+
+def conditional_page(state_func):
+    """
+    Conditional GET and cache headers for a page; `state_func(**view_kwargs)`
+    returns (version, last_modified) for what the page shows, or None if the
+    page doesn't exist. On an async view, `state_func` may be a coroutine function.
+    """
+    def state(request, **kwargs):
+        if not hasattr(request, '_page_state'):  # condition() asks for the ETag and the date separately
+            request._page_state = state_func(**kwargs)
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        page = state(request, **kwargs)
+        if page is None:
+            return None
+        version = page[0]
+        if request.user.is_authenticated:
+            version = (*version, request.user.pk, request.META.get('CSRF_COOKIE', ''))
+        return hashlib.md5(repr(version).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        page = state(request, **kwargs)
+        if page is None or request.user.is_authenticated:
+            return None
+        return page[1]
+
+    def add_cache_headers(request, response):
+        if response.status_code in (200, 304):
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PAGE_CACHE_SECONDS)
+            patch_vary_headers(response, ('Cookie',))
+        return response
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # condition() calls etag() and last_modified() synchronously, so
+                # load the state and the user they read before it runs
+                request.user = await request.auser()
+                if iscoroutinefunction(state_func):
+                    request._page_state = await state_func(**kwargs)
+                else:
+                    request._page_state = await sync_to_async(state_func)(**kwargs)
+                return add_cache_headers(request, await conditional_view(request, *args, **kwargs))
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return add_cache_headers(request, conditional_view(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from requests.adapters import HTTPAdapter
+
+# Media downloads for the populate commands and the fetch_item_image job.
+# URLs are fetched on a small thread pool with one keep-alive session per
+# thread, each URL is downloaded at most once per fetcher, and files are
+# stored under a hash of their bytes so the same image is written only once.
+#
+# With a fixture directory the fetcher can also record what it downloads and,
+# in offline mode, serve those recordings instead of touching the network.
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = (5, 15)   # (connect, read) seconds
+MAX_WORKERS = 8
+
+
+def fixture_key(url):
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+def _extension(url, content_type=''):
+    extension = mimetypes.guess_extension(content_type.split(';')[0].strip()) if content_type else None
+    if not extension:
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    return {'.jpe': '.jpg', '.jpeg': '.jpg', '': '.jpg'}.get(extension, extension)
+
+
+class MediaFetcher:
+    def __init__(self, max_workers=MAX_WORKERS, fixture_dir=None, offline=False, timeout=TIMEOUT, storage=default_storage):
+        self.max_workers = max_workers
+        self.fixture_dir = Path(fixture_dir or settings.MEDIA_FIXTURES_DIR)
+        self.offline = offline
+        self.timeout = timeout
+        self.storage = storage
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._responses = {}   # url -> (bytes, extension) or None on failure
+        self._stored = {}      # (upload_to, digest) -> storage name
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=2)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    # --- DOWNLOADING ---
+
+    def _from_fixture(self, url):
+        matches = sorted(self.fixture_dir.glob(f"{fixture_key(url)}.*")) if self.fixture_dir.is_dir() else []
+        if not matches:
+            return None
+        return matches[0].read_bytes(), matches[0].suffix
+
+    def _download(self, url):
+        recorded = self._from_fixture(url)
+        if recorded or self.offline:
+            if recorded is None:
+                logger.warning("No fixture for %s", url)
+            return recorded
+        try:
+            response = self._session().get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            logger.warning("Could not fetch %s: %s", url, exc)
+            return None
+        return response.content, _extension(url, response.headers.get('Content-Type', ''))
+
+    def fetch(self, url):
+        """Bytes and file extension for `url`, or None if it could not be fetched."""
+        with self._lock:
+            if url in self._responses:
+                return self._responses[url]
+        result = self._download(url)
+        with self._lock:
+            self._responses.setdefault(url, result)
+        return result
+
+    def prefetch(self, urls):
+        """Download every distinct URL concurrently; returns how many succeeded."""
+        pending = [url for url in dict.fromkeys(urls) if url not in self._responses]
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                list(pool.map(self.fetch, pending))
+        return sum(1 for url in urls if self._responses.get(url))
+
+    def record(self, urls=None):
+        """Write fetched responses into the fixture directory for later offline runs."""
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+        written = 0
+        for url, result in self._responses.items():
+            if result is None or (urls is not None and url not in urls):
+                continue
+            data, extension = result
+            path = self.fixture_dir / f"{fixture_key(url)}{extension}"
+            if not path.exists():
+                path.write_bytes(data)
+                written += 1
+        return written
+
+    # --- STORING ---
+
+    def store(self, url, upload_to):
+        """Save the image at `url` under `upload_to` and return its storage name, or None."""
+        result = self.fetch(url)
+        if result is None:
+            return None
+        data, extension = result
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        key = (upload_to, digest)
+        if key not in self._stored:
+            name = f"{upload_to.rstrip('/')}/{digest}{extension}"
+            if not self.storage.exists(name):
+                name = self.storage.save(name, ContentFile(data))
+            self._stored[key] = name
+        return self._stored[key]
+
+
+# --- MANAGEMENT COMMAND OPTIONS ---
+
+def add_arguments(parser):
+    parser.add_argument('--offline', action='store_true', help='Serve images from MEDIA_FIXTURES_DIR instead of the network')
+    parser.add_argument('--record', action='store_true', help='Save downloaded images into MEDIA_FIXTURES_DIR for --offline runs')
+    parser.add_argument('--fetch-workers', type=int, default=MAX_WORKERS, help='Concurrent image downloads')
+
+
+def fetcher_from_options(options):
+    return MediaFetcher(max_workers=options['fetch_workers'], offline=options['offline'])
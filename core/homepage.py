@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import jobs
+from .caching import single_flight
+from .models import Item, Job, Review, ReviewerStats
+
+# The home page is the same for every anonymous visitor, so its context is
+# built off the request path and kept in the cache as a snapshot. The worker
+# rebuilds it every HOME_SNAPSHOT_SECONDS (the `build_home_snapshot` job puts
+# its own row back in the queue) and as soon as a featured item or review
+# changes. A snapshot older than that is still served, for up to
+# HOME_SNAPSHOT_STALE_SECONDS more, while a rebuild is queued; only a missing
+# or expired one is built during the request, by one request at a time while
+# the rest wait for it. If no worker takes the queued rebuild within
+# WORKER_GRACE_SECONDS (none is running), a request rebuilds the snapshot
+# itself, so the page never falls further behind than that. Signed-in
+# visitors get the same context built live.
+#
+# The hero carousel shows at most HOME_HERO_LIMIT featured items and moves on
+# to the next ones every HOME_HERO_ROTATE_SECONDS, the same set for everyone.
+
+SNAPSHOT_KEY = 'home:snapshot'
+REBUILD_JOB = 'build_home_snapshot'
+# How often a process serving a stale snapshot checks that a rebuild is queued
+REBUILD_CHECK_SECONDS = 30
+# How long a queued rebuild may wait for a worker before a request does it
+WORKER_GRACE_SECONDS = 30
+
+
+def hero_items(now):
+    featured = list(Item.objects.filter(is_featured=True).order_by('-created_at').values_list('pk', flat=True))
+    limit = settings.HOME_HERO_LIMIT
+    if len(featured) > limit:
+        slot = int(now.timestamp()) // settings.HOME_HERO_ROTATE_SECONDS
+        start = slot * limit % len(featured)
+        featured = (featured + featured)[start:start + limit]
+    items = Item.objects.in_bulk(featured)
+    return [items[pk] for pk in featured if pk in items]
+
+
+def build_context(windows=None):
+    """Everything the home page shows; the leaderboard for each of `windows` (default: all of them)."""
+    return {
+        'hero_items': hero_items(timezone.now()),
+        'top_rated': list(Item.objects.order_by('-weighted_rating')[:4]),
+        'latest_items': list(Item.objects.order_by('-created_at')[:4]),
+        'featured_reviewers': {
+            window: ReviewerStats.leaderboard(window, limit=4)
+            for window in (windows or ReviewerStats.LEADERBOARD_WINDOWS)
+        },
+        'featured_review': Review.objects.filter(is_featured=True).first(),
+    }
+
+
+def build_snapshot():
+    snapshot = {'built_at': timezone.now(), 'context': build_context()}
+    cache.set(SNAPSHOT_KEY, snapshot, settings.HOME_SNAPSHOT_SECONDS + settings.HOME_SNAPSHOT_STALE_SECONDS)
+    return snapshot
+
+
+def move_queued_rebuild(run_at):
+    """Bring a queued rebuild forward to `run_at` if it is due later; False if none is queued."""
+    waiting = Job.objects.filter(name=REBUILD_JOB, status='QUEUED')
+    return waiting.filter(run_at__lte=run_at).exists() or bool(waiting.update(run_at=run_at))
+
+
+def schedule_rebuild(delay=0):
+    """Queue a snapshot rebuild `delay` seconds from now, unless one is already due by then."""
+    run_at = timezone.now() + timedelta(seconds=delay)
+    if not move_queued_rebuild(run_at):
+        jobs.enqueue(REBUILD_JOB, run_at=run_at)
+
+
+def rebuild_overdue():
+    """Whether a queued rebuild has been due for WORKER_GRACE_SECONDS without a worker taking it."""
+    overdue = timezone.now() - timedelta(seconds=WORKER_GRACE_SECONDS)
+    return Job.objects.filter(name=REBUILD_JOB, status='QUEUED', run_at__lte=overdue).exists()
+
+
+def snapshot_context():
+    """The anonymous home page context: the snapshot, stale or not, or a new one if there is none."""
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return single_flight(SNAPSHOT_KEY, build_snapshot)['context']
+    age = timezone.now() - snapshot['built_at']
+    if age > timedelta(seconds=settings.HOME_SNAPSHOT_SECONDS) and cache.add(
+        f'{SNAPSHOT_KEY}:rebuild-check', True, REBUILD_CHECK_SECONDS
+    ):
+        if rebuild_overdue():
+            return build_snapshot()['context']
+        schedule_rebuild()
+    return snapshot['context']
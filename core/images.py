@@ -0,0 +1,88 @@
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Responsive derivatives for uploaded images. Each source is resized to a few
+# widths in WebP and JPEG and written under media/derived/, named by a hash of
+# the source bytes so identical uploads share files and a replaced image never
+# reuses a stale URL. The resulting manifest is stored on the model
+# (`image_variants`) so templates can build a srcset without touching disk.
+
+WIDTHS = (240, 480, 960)
+FORMATS = (
+    # (extension, Pillow format, quality)
+    ('webp', 'WEBP', 78),
+    ('jpeg', 'JPEG', 82),
+)
+DERIVED_DIR = 'derived'
+
+
+def derived_name(digest, width, extension):
+    return f"{DERIVED_DIR}/{digest[:2]}/{digest}-{width}.{extension}"
+
+
+def _encode(image, width, pil_format, quality):
+    resized = image.copy()
+    resized.thumbnail((width, width * 10), Image.LANCZOS)
+    if pil_format == 'JPEG' and resized.mode != 'RGB':
+        background = Image.new('RGB', resized.size, 'white')
+        background.paste(resized, mask=resized.getchannel('A') if 'A' in resized.getbands() else None)
+        resized = background
+    buffer = io.BytesIO()
+    resized.save(buffer, pil_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(field_file, storage=default_storage):
+    """Write the derivatives for `field_file` and return its manifest."""
+    manifest = {'source': field_file.name}
+    try:
+        with storage.open(field_file.name, 'rb') as source:
+            data = source.read()
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        # Missing or unreadable source: record it so we don't retry on every save
+        return manifest
+
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    width, height = image.size
+    # Never upscale; a small source gets a single variant at its own width
+    widths = [w for w in WIDTHS if w < width] + [min(width, WIDTHS[-1])]
+
+    variants = {}
+    for extension, pil_format, quality in FORMATS:
+        variants[extension] = []
+        for target in sorted(set(widths)):
+            name = derived_name(digest, target, extension)
+            if not storage.exists(name):
+                storage.save(name, ContentFile(_encode(image, target, pil_format, quality)))
+            variants[extension].append([target, name])
+
+    manifest.update({'hash': digest, 'width': width, 'height': height, 'variants': variants})
+    return manifest
+
+
+def needs_variants(field_file, manifest):
+    return bool(field_file) and (manifest or {}).get('source') != field_file.name
+
+
+def refresh_variants(instance, field='image', manifest_field='image_variants', force=False):
+    """Rebuild the manifest for one model instance if its image changed; returns True if rebuilt."""
+    field_file = getattr(instance, field)
+    manifest = getattr(instance, manifest_field)
+    if not field_file or not (force or needs_variants(field_file, manifest)):
+        return False
+    manifest = build_variants(field_file)
+    changes = {manifest_field: manifest}
+    if hasattr(instance, 'updated_at'):  # the rendered srcset changes with the manifest
+        changes['updated_at'] = timezone.now()
+    type(instance).objects.filter(pk=instance.pk).update(**changes)
+    setattr(instance, manifest_field, manifest)
+    return True
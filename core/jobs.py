@@ -0,0 +1,185 @@
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+# A small job queue stored in the database. Views enqueue work with
+# `enqueue('name', **payload)`; `manage.py run_worker` claims due jobs one row
+# at a time, runs the registered handler and retries failures with exponential
+# backoff until `max_attempts`, after which the job is left DEAD for the admin.
+# The Procfile runs the worker as its own process type next to `web`.
+#
+# Finished rows are pruned by the worker after DONE_RETENTION (DEAD ones are
+# kept longer, for the admin's requeue action). Handlers registered with
+# `sensitive=True` (e.g. mail carrying password-reset links) also have their
+# payload cleared as soon as they succeed. A handler that returns a datetime
+# is run again at that time on the same row, so a recurring job doesn't leave
+# a DONE row behind for every run.
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 5          # seconds before the first retry
+BACKOFF_MAX = 60 * 60     # never wait more than an hour between attempts
+LOCK_TIMEOUT = 10 * 60    # a RUNNING job older than this is assumed to have lost its worker
+DONE_RETENTION = 24 * 60 * 60       # finished jobs are deleted after a day
+DEAD_RETENTION = 14 * 24 * 60 * 60  # dead ones after two weeks
+
+_handlers = {}
+_sensitive = set()
+
+
+class UnknownJob(Exception):
+    pass
+
+
+def register(name, max_attempts=5, sensitive=False):
+    """Decorator: make a function runnable as job `name`; it receives the payload as kwargs."""
+    def decorator(func):
+        _handlers[name] = (func, max_attempts)
+        if sensitive:
+            _sensitive.add(name)
+        return func
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    if name not in _handlers:
+        raise UnknownJob(name)
+    _, max_attempts = _handlers[name]
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def enqueue_unique(name, run_at=None, **payload):
+    """Like `enqueue`, but reuse an identical job that is still waiting to run."""
+    waiting = Job.objects.filter(name=name, payload=payload, status='QUEUED').first()
+    return waiting or enqueue(name, run_at, **payload)
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --- CLAIMING ---
+
+def claim(worker_id):
+    """Atomically take the next due job for `worker_id`, or return None."""
+    now = timezone.now()
+    due = Job.objects.filter(status='QUEUED', run_at__lte=now).order_by('run_at', 'pk')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = due.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(
+                status='RUNNING', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1
+            )
+        job.refresh_from_db()
+        return job
+
+    # No SKIP LOCKED (SQLite): race on a conditional UPDATE, the loser moves on
+    for pk in due.values_list('pk', flat=True)[:10]:
+        claimed = Job.objects.filter(pk=pk, status='QUEUED').update(
+            status='RUNNING', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def release_stale():
+    """Requeue jobs whose worker died mid-run; they count as a failed attempt."""
+    cutoff = timezone.now() - timedelta(seconds=LOCK_TIMEOUT)
+    stale = Job.objects.filter(status='RUNNING', locked_at__lt=cutoff)
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='DEAD', last_error='Worker lost while running', locked_by='', finished_at=timezone.now()
+    )
+    requeued = stale.update(status='QUEUED', locked_by='', run_at=timezone.now())
+    return requeued, dead
+
+
+def prune():
+    """Delete finished jobs past their retention; returns the number of rows removed."""
+    now = timezone.now()
+    deleted, _ = Job.objects.filter(
+        Q(status='DONE', finished_at__lt=now - timedelta(seconds=DONE_RETENTION))
+        | Q(status='DEAD', finished_at__lt=now - timedelta(seconds=DEAD_RETENTION))
+    ).delete()
+    return deleted
+
+
+# --- RUNNING ---
+
+def run(job):
+    func, _ = _handlers.get(job.name, (None, None))
+    try:
+        if func is None:
+            raise UnknownJob(job.name)
+        rerun_at = func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts or func is None:
+            Job.objects.filter(pk=job.pk).update(
+                status='DEAD', last_error=error, locked_by='', finished_at=timezone.now()
+            )
+            logger.error("Job %s dead after %s attempts", job, job.attempts)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='QUEUED', last_error=error, locked_by='', run_at=timezone.now() + backoff(job.attempts)
+            )
+            logger.warning("Job %s failed, retrying", job)
+        return False
+
+    if isinstance(rerun_at, datetime):
+        Job.objects.filter(pk=job.pk).update(
+            status='QUEUED', attempts=0, locked_by='', last_error='', run_at=rerun_at
+        )
+        return True
+
+    done = {'payload': {}} if job.name in _sensitive else {}
+    Job.objects.filter(pk=job.pk).update(status='DONE', locked_by='', finished_at=timezone.now(), **done)
+    return True
+
+
+def work(worker_id=None, once=False, poll_interval=1.0, should_stop=lambda: False):
+    """Claim and run jobs until stopped; with `once`, return when the queue is drained."""
+    worker_id = worker_id or worker_name()
+    processed = 0
+    last_sweep = 0
+
+    while not should_stop():
+        close_old_connections()
+        if time.monotonic() - last_sweep > LOCK_TIMEOUT / 10:
+            release_stale()
+            prune()
+            last_sweep = time.monotonic()
+
+        job = claim(worker_id)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        run(job)
+        processed += 1
+    return processed
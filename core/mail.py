@@ -0,0 +1,61 @@
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import jobs
+
+# EMAIL_BACKEND that hands every message to the job queue instead of talking
+# to SMTP inside the request. The `send_email` job rebuilds the message and
+# delivers it through settings.QUEUED_EMAIL_BACKEND.
+
+
+def serialize_message(message):
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'alternatives': [[content, mimetype] for content, mimetype in getattr(message, 'alternatives', [])],
+        'attachments': [
+            [filename, base64.b64encode(content.encode() if isinstance(content, str) else content).decode(), mimetype]
+            for filename, content, mimetype in message.attachments
+        ],
+    }
+
+
+def deserialize_message(data, connection=None):
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        connection=connection,
+    )
+    for content, mimetype in data['alternatives']:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        queued = 0
+        for message in email_messages:
+            if any(not isinstance(attachment, tuple) for attachment in message.attachments):
+                # MIME parts can't be serialized; deliver these directly
+                queued += get_connection(settings.QUEUED_EMAIL_BACKEND).send_messages([message])
+                continue
+            jobs.enqueue('send_email', message=serialize_message(message))
+            queued += 1
+        return queued
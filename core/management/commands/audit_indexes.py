@@ -0,0 +1,140 @@
+import re
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from core import search
+from core.models import Category, Item, Review
+
+# Plan steps worth a look: a table read end to end, or rows sorted/grouped in
+# a temporary B-tree because no index delivers them in order.
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+# Schema probes, and bm25-ranked full-text matches that no index can order
+IGNORED = ('sqlite_master', search.FTS_TABLE)
+
+
+class Command(BaseCommand):
+    help = 'Runs every core view, EXPLAINs the queries it makes and flags full scans and temp B-tree sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to browse as (default: the user with the most referrals)')
+        parser.add_argument('--min-rows', type=int, default=1000, help="Ignore full scans of tables smaller than this")
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan, not just findings')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error if anything is flagged')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('audit_indexes reads SQLite query plans; the default database is not SQLite')
+        self.min_rows = options['min_rows']
+        self.row_counts = {}
+
+        user = self.pick_user(options['user'])
+        # A view that errors still reports the queries it ran before failing
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0], raise_request_exception=False)
+        flagged = 0
+        for name, path in self.view_paths(user):
+            queries = self.capture(client, user, path)
+            findings = defaultdict(set)
+            for sql in queries:
+                for detail in self.plan(sql):
+                    if options['verbose_plans']:
+                        self.stdout.write(f"   {detail}")
+                    problem = self.problem(detail)
+                    if problem:
+                        findings[problem].add(sql)
+
+            status = self.style.WARNING(f"{len(findings)} issue(s)") if findings else self.style.SUCCESS('ok')
+            self.stdout.write(f"{name} ({path}): {len(queries)} queries, {status}")
+            for problem, statements in findings.items():
+                self.stdout.write(f"   {problem}")
+                for sql in sorted(statements)[:2]:
+                    self.stdout.write(f"      {sql[:200]}")
+            flagged += len(findings)
+
+        if flagged and options['fail']:
+            raise CommandError(f"{flagged} query plan issue(s) found")
+        self.stdout.write(self.style.SUCCESS(f'Audit finished: {flagged} issue(s) flagged.'))
+
+    # --- REQUESTS ---
+
+    def pick_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user '{username}'")
+        # The busiest account, so paginated lists actually run their page queries
+        user = User.objects.annotate(n=Count('referrals_made')).order_by('-n', 'pk').first()
+        if user is None:
+            raise CommandError('No users to browse as; run generate_dataset first')
+        return user
+
+    def view_paths(self, user):
+        """(url name, path) for every URL routed to core.views, filled with busy sample rows."""
+        item = Item.objects.order_by('-review_count', 'pk').first()
+        category = Category.objects.order_by('-subtree_item_count', 'pk').first()
+        review = Review.objects.filter(author=user).order_by('pk').first()
+        samples = {
+            'category_detail': {'slug': category.slug if category else 'missing'},
+            'delete_review': {'review_id': review.pk if review else 0},
+        }
+        for pattern in get_resolver().url_patterns:
+            if not isinstance(pattern, URLPattern) or getattr(pattern.callback, '__module__', '') != 'core.views':
+                continue
+            kwargs = samples.get(pattern.name)
+            if kwargs is None and 'slug' in pattern.pattern.converters:
+                kwargs = {'slug': item.slug if item else 'missing'}
+            path = reverse(pattern.name, kwargs=kwargs)
+            if pattern.name == 'search' and item:
+                path += f"?query={item.name.split()[0]}"
+            yield pattern.name, path
+
+    def capture(self, client, user, path):
+        """SELECTs a GET of `path` runs; anything the view writes is rolled back."""
+        with transaction.atomic():
+            client.force_login(user)
+            with CaptureQueriesContext(connection) as captured:
+                client.get(path)
+            transaction.set_rollback(True)
+        return [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+            and not any(name in query['sql'] for name in IGNORED)
+        ]
+
+    # --- PLANS ---
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            except Exception as exc:  # e.g. SQL the capture couldn't re-quote
+                return [f'(not explained: {exc})']
+            return [row[3] for row in cursor.fetchall()]
+
+    def problem(self, detail):
+        scan = FULL_SCAN.match(detail)
+        if scan:
+            table = scan.group(1)
+            rows = self.count(table)
+            return f"full scan of {table} ({rows:,} rows)" if rows >= self.min_rows else None
+        sort = TEMP_BTREE.search(detail)
+        if sort:
+            return f"temp B-tree for {sort.group(1)}"
+        return None
+
+    def count(self, table):
+        if table not in self.row_counts:
+            with connection.cursor() as cursor:
+                try:
+                    cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                    self.row_counts[table] = cursor.fetchone()[0]
+                except Exception:  # an alias or CTE rather than a table
+                    self.row_counts[table] = 0
+        return self.row_counts[table]
@@ -1,13 +1,15 @@
-import requests
-import os
 from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
 from django.contrib.auth.models import User
+from core import fetch, jobs
 from core.models import Category, Item, Review
 
 class Command(BaseCommand):
     help = 'Downloads real images from the web and creates products with reviews'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--defer-images', action='store_true', help='Queue image downloads for run_worker instead of fetching them inline')
+        fetch.add_arguments(parser)
+
     def handle(self, *args, **kwargs):
         self.stdout.write("Starting Real Data Fetcher...")
 
@@ -71,7 +73,16 @@ class Command(BaseCommand):
             }
         ]
 
-        # 3. Loop through and Download
+        # 3. Download all images up front, then create the products
+        fetcher = fetch.fetcher_from_options(kwargs)
+        upload_to = Item._meta.get_field('image').upload_to
+        new_products = [p for p in products if not Item.objects.filter(name=p['name']).exists()]
+        if new_products and not kwargs['defer_images']:
+            fetched = fetcher.prefetch([p['image_url'] for p in new_products])
+            self.stdout.write(f"Fetched {fetched}/{len(new_products)} images")
+            if kwargs['record']:
+                fetcher.record()
+
         for p in products:
             self.stdout.write(f"Processing: {p['name']}...")
             
@@ -92,21 +103,17 @@ class Command(BaseCommand):
                 is_featured=True  # Feature all of them so they show on Home
             )
 
-            # DOWNLOAD IMAGE
-            try:
-                response = requests.get(p['image_url'])
-                if response.status_code == 200:
-                    # Create a filename (e.g., "sony-headphones.jpg")
-                    filename = p['name'].lower().replace(" ", "-") + ".jpg"
-                    # Save content to the ImageField
-                    item.image.save(filename, ContentFile(response.content), save=False)
-                    self.stdout.write(self.style.SUCCESS(f" - Image downloaded!"))
+            if kwargs['defer_images']:
+                item.save()
+                jobs.enqueue('fetch_item_image', item_id=item.pk, url=p['image_url'])
+                self.stdout.write(" - Image download queued.")
+            else:
+                item.image = fetcher.store(p['image_url'], upload_to)
+                if item.image:
+                    self.stdout.write(self.style.SUCCESS(f" - Image stored as {item.image.name}"))
                 else:
                     self.stdout.write(self.style.ERROR(f" - Failed to download image."))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f" - Error downloading image: {e}"))
-
-            item.save()
+                item.save()
 
             # Add Reviews
             for rating, content in p['reviews']:
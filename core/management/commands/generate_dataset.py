@@ -0,0 +1,257 @@
+import random
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.text import slugify
+from core import search, wallet
+from core.models import Category, Item, LedgerEntry, PayoutRequest, Profile, Referral, Review, ReviewerStats
+
+# Sizes for --profile; any of them can be overridden on the command line.
+PROFILES = {
+    'small':  {'users': 500,    'items': 2000,   'reviews': 10000,   'roots': 6,  'depth': 2, 'fanout': 3},
+    'medium': {'users': 20000,  'items': 50000,  'reviews': 500000,  'roots': 10, 'depth': 3, 'fanout': 4},
+    'large':  {'users': 100000, 'items': 300000, 'reviews': 3000000, 'roots': 12, 'depth': 4, 'fanout': 5},
+}
+
+BRANDS = ['Samsung', 'Apple', 'Sony', 'Nike', 'Adidas', 'Dell', 'HP', 'LG', 'Rolex', 'Toyota',
+          'Tecno', 'Infinix', 'Lenovo', 'Canon', 'Casio', 'Seiko', 'Philips', 'Bosch', 'Puma', 'Asus']
+PRODUCTS = ['Phone', 'Laptop', 'Watch', 'Headphones', 'Sneakers', 'Camera', 'TV', 'Monitor',
+            'Speaker', 'Blender', 'Backpack', 'Tablet', 'Router', 'Kettle', 'Jacket', 'Drone']
+MODELS = ['Pro', 'Max', 'Ultra', 'Air', 'Sport', 'Classic', 'Elite', 'X', 'Lite', 'Plus', 'Mini', 'Neo']
+ADJECTIVES = ['reliable', 'affordable', 'premium', 'lightweight', 'durable', 'stylish', 'fast', 'quiet', 'compact']
+TOPICS = ['Home', 'Tech', 'Fashion', 'Travel', 'Sports', 'Beauty', 'Auto', 'Kitchen', 'Garden', 'Office',
+          'Gaming', 'Audio', 'Health', 'Kids', 'Pets', 'Books']
+REVIEW_LINES = {
+    1: ["Broke within a week.", "Would not buy again.", "Nothing like the description."],
+    2: ["Disappointing for the price.", "Works, but barely.", "Customer support was slow."],
+    3: ["Does the job.", "Average quality overall.", "Fine, nothing special."],
+    4: ["Very good value.", "Happy with it so far.", "Solid build, minor quirks."],
+    5: ["Absolutely love it!", "Best purchase this year.", "Exceeded my expectations."],
+}
+RATING_WEIGHTS = [6, 8, 16, 34, 36]
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generates a deterministic synthetic dataset (users, categories, items, reviews, referrals, payouts) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES, default='small')
+        parser.add_argument('--seed', type=int, default=42, help='Same seed and sizes give the same data')
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--items', type=int)
+        parser.add_argument('--reviews', type=int, help='Approximate total; capped by one review per user per item')
+        parser.add_argument('--roots', type=int, help='Top-level categories')
+        parser.add_argument('--depth', type=int, help='Levels below each root')
+        parser.add_argument('--fanout', type=int, help='Children per category')
+        parser.add_argument('--referral-rate', type=float, default=0.3, help='Share of users who were referred')
+        parser.add_argument('--payout-rate', type=float, default=0.1, help='Share of users with a payout request')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk INSERT')
+
+    def handle(self, *args, **options):
+        sizes = dict(PROFILES[options['profile']])
+        for key in sizes:
+            if options[key] is not None:
+                sizes[key] = options[key]
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.stats = []
+
+        self.stdout.write(f"Generating '{options['profile']}' dataset with seed {options['seed']}: {sizes}")
+        started = time.perf_counter()
+
+        users = self.generate_users(sizes['users'])
+        leaves = self.generate_categories(sizes['roots'], sizes['depth'], sizes['fanout'])
+        items = self.generate_items(sizes['items'], leaves, users)
+        self.generate_reviews(sizes['reviews'], items, users)
+        self.generate_referrals(users, options['referral_rate'])
+        self.generate_payouts(users, options['payout_rate'])
+        self.rebuild_derived_data()
+
+        total_rows = sum(rows for _, rows, _ in self.stats)
+        elapsed = time.perf_counter() - started
+        self.stdout.write("")
+        for label, rows, seconds in self.stats:
+            rate = f"{rows / seconds:>10,.0f} rows/s" if rows and seconds else ''
+            self.stdout.write(f"  {label:<22} {rows:>10,} rows {seconds:>8.1f}s {rate}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total_rows:,} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s overall)"
+        ))
+
+    # --- HELPERS ---
+
+    @contextmanager
+    def timed(self, label):
+        counter = {'rows': 0}
+        started = time.perf_counter()
+        yield counter
+        self.stats.append((label, counter['rows'], time.perf_counter() - started))
+        self.stdout.write(f" - {label}: {counter['rows']:,} rows")
+
+    def insert(self, model, objects):
+        """bulk_create `objects` in chunks, each in its own transaction; returns the saved objects."""
+        saved = []
+        for start in range(0, len(objects), self.chunk_size):
+            with transaction.atomic():
+                saved.extend(model.objects.bulk_create(objects[start:start + self.chunk_size]))
+        return saved
+
+    @staticmethod
+    def unique_slug(base, taken):
+        slug, n = base, 2
+        while slug in taken:
+            slug = f"{base}-{n}"
+            n += 1
+        taken.add(slug)
+        return slug
+
+    # --- TABLES ---
+
+    def generate_users(self, count):
+        with self.timed('users + profiles') as counter:
+            taken = set(User.objects.values_list('username', flat=True))
+            password = make_password('pass123')  # hashing once instead of per user
+            users = []
+            for n in range(count):
+                base = f"{self.rng.choice(BRANDS).lower()}_{self.rng.choice(ADJECTIVES)}{n}"
+                username = self.unique_slug(base, taken)
+                users.append(User(username=username, email=f"{username}@example.com", password=password))
+            users = self.insert(User, users)
+            self.insert(Profile, [Profile(user=user) for user in users])
+            counter['rows'] = len(users) * 2
+        return [user.pk for user in users]
+
+    def generate_categories(self, roots, depth, fanout):
+        """Create `roots` trees `depth` levels deep; returns the leaf category pks."""
+        with self.timed('categories') as counter:
+            taken = set(Category.objects.values_list('slug', flat=True))
+            level = []
+            for topic in self.rng.sample(TOPICS * (roots // len(TOPICS) + 1), roots):
+                level.append(Category(name=topic, slug=self.unique_slug(slugify(topic), taken)))
+            level = self.insert(Category, level)
+            counter['rows'] = len(level)
+
+            for _ in range(depth):
+                children = []
+                for parent in level:
+                    for _ in range(fanout):
+                        name = f"{self.rng.choice(ADJECTIVES).title()} {self.rng.choice(PRODUCTS)}s"
+                        children.append(Category(
+                            name=name, parent_id=parent.pk, slug=self.unique_slug(slugify(name), taken)
+                        ))
+                level = self.insert(Category, children)
+                counter['rows'] += len(level)
+        return [category.pk for category in level]
+
+    def generate_items(self, count, category_ids, user_ids):
+        with self.timed('items') as counter:
+            taken = set(Item.objects.values_list('slug', flat=True))
+            items = []
+            for n in range(count):
+                brand, product, model = self.rng.choice(BRANDS), self.rng.choice(PRODUCTS), self.rng.choice(MODELS)
+                name = f"{brand} {product} {model} {self.rng.randint(1, 99)}"
+                price = Decimal(self.rng.randint(500, 500000)) / 100
+                items.append(Item(
+                    name=name,
+                    slug=self.unique_slug(slugify(name), taken),
+                    category_id=self.rng.choice(category_ids),
+                    owner_id=self.rng.choice(user_ids) if self.rng.random() < 0.2 else None,
+                    description=f"The {self.rng.choice(ADJECTIVES)} {name} is a {self.rng.choice(ADJECTIVES)} "
+                                f"{product.lower()} from {brand}.",
+                    price=price,
+                    discount_price=(price * Decimal('0.9')).quantize(Decimal('0.01')) if self.rng.random() < 0.15 else None,
+                    specifications={'Brand': brand, 'Model': model, 'Colour': self.rng.choice(['Black', 'White', 'Blue', 'Red'])},
+                    is_featured=self.rng.random() < 0.02,
+                ))
+            items = self.insert(Item, items)
+            counter['rows'] = len(items)
+        return [item.pk for item in items]
+
+    def generate_reviews(self, count, item_ids, user_ids):
+        """Reviews spread with a long tail: a few popular items collect most of them."""
+        with self.timed('reviews') as counter:
+            by_popularity = list(item_ids)
+            self.rng.shuffle(by_popularity)
+            weights = [1 / (rank + 1) for rank in range(len(by_popularity))]
+            scale = count / sum(weights)
+            batch = []
+            for item_id, weight in zip(by_popularity, weights):
+                wanted = min(len(user_ids), int(weight * scale) + (self.rng.random() < weight * scale % 1))
+                for author_id in self.rng.sample(user_ids, wanted):
+                    rating = self.rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+                    batch.append(Review(
+                        item_id=item_id, author_id=author_id, rating=rating,
+                        title=self.rng.choice(REVIEW_LINES[rating]), content=self.rng.choice(REVIEW_LINES[rating]),
+                    ))
+                if len(batch) >= self.chunk_size:
+                    counter['rows'] += len(self.insert(Review, batch))
+                    batch = []
+            counter['rows'] += len(self.insert(Review, batch))
+
+    def generate_referrals(self, user_ids, rate):
+        with self.timed('referrals + rewards') as counter:
+            taken = set(Referral.objects.values_list('referred_user_id', flat=True))
+            referrals = []
+            for position, user_id in enumerate(user_ids[1:], start=1):
+                if user_id not in taken and self.rng.random() < rate:
+                    referrals.append(Referral(referrer_id=user_ids[self.rng.randrange(position)], referred_user_id=user_id))
+            referrals = self.insert(Referral, referrals)
+            rewards = self.insert(LedgerEntry, [
+                LedgerEntry(user_id=referral.referrer_id, account=LedgerEntry.TOKENS, kind='REFERRAL_REWARD',
+                            amount=wallet.REFERRAL_REWARD, reference=wallet.reference_for(referral))
+                for referral in referrals
+            ])
+            counter['rows'] = len(referrals) + len(rewards)
+
+    def generate_payouts(self, user_ids, rate):
+        """Each paying user gets an opening wallet balance and one payout request in a random state."""
+        with self.timed('payouts + ledger') as counter:
+            statuses = [status for status, _ in PayoutRequest.STATUS_CHOICES]
+            openings, payouts = [], []
+            for user_id in user_ids:
+                if self.rng.random() >= rate:
+                    continue
+                opening = Decimal(self.rng.randint(10, 500) * 100)
+                openings.append(LedgerEntry(
+                    user_id=user_id, account=LedgerEntry.WALLET, kind='OPENING', amount=opening
+                ))
+                payouts.append(PayoutRequest(
+                    user_id=user_id, amount=opening / 2, status=self.rng.choice(statuses),
+                    bank_name=self.rng.choice(PayoutRequest.BANK_CHOICES)[0],
+                    account_number=f"{self.rng.randrange(10 ** 10):010d}", account_name=f"User {user_id}",
+                ))
+            openings = self.insert(LedgerEntry, openings)
+            payouts = self.insert(PayoutRequest, payouts)
+
+            movements = []
+            for payout in payouts:
+                reference = wallet.reference_for(payout)
+                movements.append(LedgerEntry(
+                    user_id=payout.user_id, account=LedgerEntry.WALLET, kind='PAYOUT', amount=-payout.amount, reference=reference
+                ))
+                if payout.status == 'CANCELLED':
+                    movements.append(LedgerEntry(
+                        user_id=payout.user_id, account=LedgerEntry.WALLET, kind='PAYOUT_REFUND', amount=payout.amount, reference=reference
+                    ))
+            movements = self.insert(LedgerEntry, movements)
+            counter['rows'] = len(openings) + len(payouts) + len(movements)
+
+    # --- DERIVED DATA ---
+
+    def rebuild_derived_data(self):
+        # bulk_create skips save() and signals, so rebuild everything they maintain
+        with self.timed('category tree'):
+            Category.rebuild_tree()
+        with self.timed('rating aggregates'):
+            call_command('reconcile_ratings', stdout=self.stdout)
+        with self.timed('reviewer stats'):
+            ReviewerStats.rebuild()
+        if connection.vendor == 'sqlite':
+            with self.timed('search index'):
+                search.rebuild_index()
+        with self.timed('wallet balances'):
+            wallet.rebuild_projection()
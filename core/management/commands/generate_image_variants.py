@@ -0,0 +1,45 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from core import images
+from core.models import Item, Profile
+
+class Command(BaseCommand):
+    help = 'Writes the resized WebP/JPEG variants for existing Item and Profile images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['item', 'profile'], help='Only process one model')
+        parser.add_argument('--force', action='store_true', help='Rebuild even when the manifest is current')
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        models = {'item': Item, 'profile': Profile}
+        if options['model']:
+            models = {options['model']: models[options['model']]}
+
+        for label, model in models.items():
+            built = original_bytes = smallest_bytes = 0
+            last_pk = 0
+            while True:
+                chunk = list(
+                    model.objects.filter(pk__gt=last_pk).exclude(image='')
+                    .only('pk', 'image', 'image_variants').order_by('pk')[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                last_pk = chunk[-1].pk
+                for instance in chunk:
+                    if not images.refresh_variants(instance, force=options['force']):
+                        continue
+                    built += 1
+                    variants = instance.image_variants.get('variants')
+                    if variants:
+                        original_bytes += default_storage.size(instance.image.name)
+                        smallest_bytes += default_storage.size(variants['webp'][0][1])
+
+            self.stdout.write(f"{label}: {built} images processed")
+            if original_bytes:
+                self.stdout.write(
+                    f"  originals {original_bytes / 1024:.0f} KB -> smallest WebP {smallest_bytes / 1024:.0f} KB"
+                )
+
+        self.stdout.write(self.style.SUCCESS('Image variants generated!'))
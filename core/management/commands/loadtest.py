@@ -0,0 +1,178 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Category, Item
+
+# How each mode is served, both by gunicorn with the same number of workers.
+# asgi is the production run mode (Procfile): the async views on each
+# worker's event loop. wsgi is the sync deployment it replaced, `gunicorn
+# config.wsgi`: one request at a time per worker.
+SERVERS = {
+    'asgi': ['config.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+    'wsgi': ['config.wsgi:application'],
+}
+STARTUP_TIMEOUT = 30.0
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _proc_status(pid):
+    """Resident memory (MB) and thread count of `pid`, from /proc; (0, 0) where there is none."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+    except OSError:
+        return 0.0, 0
+    return int(fields['VmRSS'].split()[0]) / 1024, int(fields['Threads'])
+
+
+def _server_status(pid):
+    """Resident memory (MB) and thread count of the gunicorn master `pid` and its workers together."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            pids = [pid, *map(int, children.read().split())]
+    except OSError:
+        pids = [pid]
+    statuses = [_proc_status(each) for each in pids]
+    return sum(rss for rss, _ in statuses), sum(threads for _, threads in statuses)
+
+
+async def _client(http, paths, index, deadline, latencies, failures):
+    """One connection's worth of traffic: the next path as soon as the last response arrives."""
+    request = index
+    while time.monotonic() < deadline:
+        path = paths[request % len(paths)]
+        request += 1
+        started = time.perf_counter()
+        try:
+            response = await http.get(path)
+        except httpx.HTTPError:
+            failures.append(path)
+            continue
+        if response.status_code >= 400:
+            failures.append(path)
+        else:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _sample_memory(pid, stop, samples):
+    while not stop.is_set():
+        samples.append(_server_status(pid))
+        await asyncio.sleep(0.2)
+
+
+async def _drive(base_url, paths, connections, duration, pid):
+    latencies, failures, samples = [], [], []
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as http:
+        for path in paths:  # warm the caches and the cached templates first
+            await http.get(path)
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_memory(pid, stop, samples))
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(
+            _client(http, paths, i, deadline, latencies, failures) for i in range(connections)
+        ))
+        stop.set()
+        await sampler
+    return latencies, failures, samples
+
+
+class Command(BaseCommand):
+    help = 'Compares throughput and memory of the ASGI (async views) and WSGI (sync) deployments under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['asgi', 'wsgi', 'both'], default='both')
+        parser.add_argument('--connections', type=int, default=50, help='Concurrent client connections')
+        parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 4)),
+                            help='gunicorn workers per mode (default: WEB_CONCURRENCY, as in the Procfile, or 4)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per mode')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable); defaults to the public read pages')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        modes = ['asgi', 'wsgi'] if options['mode'] == 'both' else [options['mode']]
+        self.stdout.write(
+            f"{options['connections']} connections, {options['workers']} workers, "
+            f"{options['duration']:.0f}s per mode, {len(paths)} paths"
+        )
+        results = {}
+        for mode in modes:
+            stats = self.run_mode(mode, paths, options['workers'], options['connections'], options['duration'])
+            results[mode] = stats
+            self.stdout.write(
+                f" - {mode}: {stats['requests_per_s']:,.0f} req/s, p50 {stats['p50_ms']:.1f}ms, "
+                f"p95 {stats['p95_ms']:.1f}ms, {stats['errors']:,} errors, "
+                f"peak RSS {stats['peak_rss_mb']:.0f} MB, up to {stats['threads']} threads (all processes)"
+            )
+        if len(results) == 2 and results['wsgi']['requests_per_s']:
+            ratio = results['asgi']['requests_per_s'] / results['wsgi']['requests_per_s']
+            self.stdout.write(f" - asgi/wsgi throughput: {ratio:.1f}x")
+        self.stdout.write(self.style.SUCCESS('Load test finished!'))
+
+    def default_paths(self):
+        item = Item.objects.order_by('-review_count', 'pk').only('slug').first()
+        category = Category.objects.filter(parent=None).order_by('-subtree_item_count', 'pk').only('slug').first()
+        if item is None or category is None:
+            raise CommandError('No items or categories to request; load some data first (manage.py generate_dataset)')
+        word = item.name.split()[0]
+        return ['/', f'/item/{item.slug}/', '/categories/', f'/category/{category.slug}/',
+                f'/search/?query={word}', f'/buy/{item.slug}/']
+
+    def run_mode(self, mode, paths, workers, connections, duration):
+        """Serve the site in `mode` on a free port, load it, and stop it again."""
+        port = _free_port()
+        # The server's own output (slow-request log, warnings) goes to a file, shown if it fails to start
+        with tempfile.TemporaryFile(mode='w+') as log:
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', *SERVERS[mode], '--workers', str(workers),
+                 '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+                cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+            )
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                try:
+                    self.wait_for(server, base_url)
+                except CommandError:
+                    log.seek(0)
+                    self.stderr.write(log.read()[-2000:])
+                    raise
+                latencies, failures, samples = asyncio.run(_drive(base_url, paths, connections, duration, server.pid))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        latencies.sort()
+        return {
+            'requests_per_s': len(latencies) / duration,
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p95_ms': statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else 0.0,
+            'errors': len(failures),
+            'peak_rss_mb': max((rss for rss, _ in samples), default=0.0),
+            'threads': max((threads for _, threads in samples), default=0),
+        }
+
+    def wait_for(self, server, base_url):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'The server exited with status {server.returncode}')
+            try:
+                httpx.get(base_url + '/', timeout=1.0)
+                return
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        raise CommandError(f'The server did not answer within {STARTUP_TIMEOUT:.0f}s')
@@ -1,13 +1,16 @@
 import random
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
-import requests
+from core import fetch, jobs
 from core.models import Category, Item, Review
 
 class Command(BaseCommand):
     help = 'Generates 100+ products using a mix-and-match algorithm'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--defer-images', action='store_true', help='Queue image downloads for run_worker instead of fetching them inline')
+        fetch.add_arguments(parser)
+
     def handle(self, *args, **kwargs):
         self.stdout.write("Starting Mass Population (100+ Items)...")
 
@@ -37,6 +40,16 @@ class Command(BaseCommand):
             ]
         }
 
+        # Download each pool image once, concurrently, before generating items
+        fetcher = fetch.fetcher_from_options(kwargs)
+        upload_to = Item._meta.get_field('image').upload_to
+        if not kwargs['defer_images']:
+            pool_urls = [url for urls in image_pool.values() for url in urls]
+            fetched = fetcher.prefetch(pool_urls)
+            self.stdout.write(f"Fetched {fetched}/{len(pool_urls)} pool images")
+            if kwargs['record']:
+                fetcher.record()
+
         # 3. Generator Data
         brands = ['Samsung', 'Apple', 'Sony', 'Nike', 'Adidas', 'Dell', 'HP', 'LG', 'Rolex', 'Toyota']
         models = ['Pro', 'Max', 'Ultra', 'Air', 'Sport', 'Classic', 'Elite', 'X', 'Series 9', 'Fold']
@@ -82,16 +95,13 @@ class Command(BaseCommand):
                 is_featured=random.choice([True, False, False]) # 33% chance featured
             )
 
-            # Download Image (Fast mode: Using known working URLs)
-            try:
-                response = requests.get(img_url, timeout=5)
-                if response.status_code == 200:
-                    filename = f"{random.randint(1000,9999)}_{cat_name.lower()}.jpg"
-                    item.image.save(filename, ContentFile(response.content), save=False)
-            except:
-                pass # If download fails, just skip image but keep item
-            
-            item.save()
+            if kwargs['defer_images']:
+                item.save()
+                jobs.enqueue('fetch_item_image', item_id=item.pk, url=img_url)
+            else:
+                # Items sharing a pool image share one stored file; no image if the download failed
+                item.image = fetcher.store(img_url, upload_to)
+                item.save()
             count += 1
             
             # Add Rating
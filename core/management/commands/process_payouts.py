@@ -0,0 +1,42 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core import payouts
+from core.models import PayoutRequest
+
+class Command(BaseCommand):
+    help = 'Moves payout requests to a new status in set-based batches (cancellations are refunded)'
+
+    def add_arguments(self, parser):
+        statuses = list(PayoutRequest.TRANSITIONS)
+        parser.add_argument('target', choices=statuses, help='Status to move the requests to')
+        parser.add_argument('--from', dest='source', choices=statuses, help='Only move requests currently in this status')
+        parser.add_argument('--ids', nargs='+', type=int, help='Only move these request ids')
+        parser.add_argument('--older-than-hours', type=float, help='Only move requests created before this many hours ago')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        target = options['target']
+        queryset = PayoutRequest.objects.all()
+        if options['source']:
+            if options['source'] not in PayoutRequest.sources_for(target):
+                raise CommandError(f"{options['source']} requests cannot be moved to {target}.")
+            queryset = queryset.filter(status=options['source'])
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+        if options['older_than_hours'] is not None:
+            queryset = queryset.filter(created_at__lt=timezone.now() - timedelta(hours=options['older_than_hours']))
+
+        self.stdout.write(f"Moving payout requests to {target}...")
+        batches = payouts.transition(
+            queryset,
+            target,
+            chunk_size=options['chunk_size'],
+            on_batch=lambda b: self.stdout.write(
+                f" - Batch {b.number}: {b.moved} moved, {b.refunded} refunded in {b.seconds * 1000:.1f}ms"
+            ),
+        )
+
+        moved = sum(b.moved for b in batches)
+        seconds = sum(b.seconds for b in batches)
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} requests to {target} in {seconds:.2f}s'))
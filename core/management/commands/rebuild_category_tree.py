@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from core import caching
+from core.models import Category
+
+class Command(BaseCommand):
+    help = 'Recomputes category paths, depths and direct/subtree item counts'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rebuilding category tree...")
+        started = time.perf_counter()
+        count = Category.rebuild_tree()
+        caching.bump_namespace('category')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} categories in {elapsed:.1f}s'))
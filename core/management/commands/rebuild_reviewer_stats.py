@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core.models import ReviewerStats
+
+class Command(BaseCommand):
+    help = 'Recomputes the reviewer leaderboard stats and daily buckets from the Review and Referral tables'
+
+    def handle(self, *args, **options):
+        users, days = ReviewerStats.rebuild()
+        self.stdout.write(f"Rebuilt stats for {users} users ({days} reviewer-days)")
+        self.stdout.write(self.style.SUCCESS('Reviewer stats rebuilt!'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from core.models import Item, Review
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored review count, rating sum and weighted rating of every Item'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many items have drifted')
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(item=OuterRef('pk')).order_by().values('item')
+        true_count = Coalesce(
+            Subquery(reviews.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), Value(0)
+        )
+        true_sum = Coalesce(
+            Subquery(reviews.annotate(total=Sum('rating')).values('total'), output_field=IntegerField()), Value(0)
+        )
+
+        drifted = Item.objects.annotate(true_count=true_count, true_sum=true_sum).filter(
+            ~Q(review_count=F('true_count')) | ~Q(rating_sum=F('true_sum'))
+        ).count()
+        self.stdout.write(f"Items with drifted aggregates: {drifted}")
+
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            # Two set-based passes: the counts first, then the score derived from them.
+            Item.objects.update(review_count=true_count, rating_sum=true_sum)
+            Item.objects.update(
+                weighted_rating=Item.weighted_rating_expression(F('review_count'), F('rating_sum'))
+            )
+
+        self.stdout.write(self.style.SUCCESS('Rating aggregates reconciled!'))
@@ -0,0 +1,53 @@
+import multiprocessing
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core import jobs
+
+def _work(index, once, poll_interval):
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    jobs.work(
+        worker_id=f"{jobs.worker_name()}#{index}",
+        once=once,
+        poll_interval=poll_interval,
+        should_stop=stopping.is_set,
+    )
+
+class Command(BaseCommand):
+    help = 'Runs background job workers that claim and execute queued jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes to run')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        self.stdout.write(f"Starting {processes} worker process(es)...")
+
+        if processes == 1:
+            _work(0, options['once'], options['poll_interval'])
+            self.stdout.write(self.style.SUCCESS('Worker stopped.'))
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_work, args=(i, options['once'], options['poll_interval']))
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('All workers stopped.'))
@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+ALIAS = 'stress'
+
+
+def _mode_settings(mode, path):
+    """The default database's settings pointed at `path`, with or without the production tuning."""
+    base = dict(connections['default'].settings_dict)
+    base['NAME'] = path
+    # Both modes reconnect for every request, as the ASGI web process does
+    # (config/asgi.py), so the comparison only measures the tuning it gets
+    if mode == 'stock':
+        base.update(OPTIONS={}, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    else:
+        base.update(OPTIONS=_tuned_options(), CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    return base
+
+
+def _tuned_options():
+    return {
+        'timeout': settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in settings.SQLITE_PRAGMAS.items()),
+    }
+
+
+def _client(index, mode, path, duration, writer, results):
+    """One simulated worker: a request per loop, each a read-then-write transaction (or a read)."""
+    wrapper = DatabaseWrapper(_mode_settings(mode, path), alias=ALIAS)
+    connections[ALIAS] = wrapper
+    done, errors, latencies = 0, 0, []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(using=ALIAS), wrapper.cursor() as cursor:
+                cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM stress_event WHERE client = %s', [index])
+                if writer:
+                    seq = cursor.fetchone()[0] + 1
+                    cursor.execute(
+                        'INSERT INTO stress_event (client, seq, payload) VALUES (%s, %s, %s)', [index, seq, 'x' * 200]
+                    )
+                else:
+                    cursor.execute('SELECT COUNT(*) FROM stress_event')
+            done += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OperationalError:  # "database is locked"
+            errors += 1
+        wrapper.close()  # what the end of a request does without persistent connections
+    results.put({'writer': writer, 'done': done, 'errors': errors, 'latencies': latencies})
+
+
+class Command(BaseCommand):
+    help = 'Measures concurrent SQLite throughput with stock settings and with the production tuning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Processes doing read-then-write transactions')
+        parser.add_argument('--readers', type=int, default=4, help='Processes doing read-only requests')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds to run each mode')
+        parser.add_argument('--mode', choices=['stock', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        modes = ['stock', 'tuned'] if options['mode'] == 'both' else [options['mode']]
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['duration']:.0f}s per mode"
+        )
+        results = {}
+        for mode in modes:
+            stats = self.run_mode(mode, options['writers'], options['readers'], options['duration'])
+            results[mode] = stats
+            self.stdout.write(
+                f" - {mode}: {stats['writes_per_s']:,.0f} writes/s, {stats['reads_per_s']:,.0f} reads/s, "
+                f"{stats['errors']:,} lock errors, write p95 {stats['write_p95_ms']:.1f}ms"
+            )
+        if len(results) == 2 and results['stock']['writes_per_s']:
+            ratio = results['tuned']['writes_per_s'] / results['stock']['writes_per_s']
+            self.stdout.write(f" - tuned/stock write throughput: {ratio:.1f}x")
+        self.stdout.write(self.style.SUCCESS('Stress test finished!'))
+
+    def run_mode(self, mode, writers, readers, duration):
+        """Run every client against a fresh database file and return the combined numbers."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stress.sqlite3')
+            with sqlite3.connect(path) as db:
+                db.execute('CREATE TABLE stress_event (id INTEGER PRIMARY KEY, client INT, seq INT, payload TEXT)')
+                db.execute('CREATE INDEX stress_event_client ON stress_event (client, seq)')
+
+            connections.close_all()  # children must not share the parent's connections
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            clients = [
+                context.Process(target=_client, args=(i, mode, path, duration, i < writers, queue))
+                for i in range(writers + readers)
+            ]
+            for client in clients:
+                client.start()
+            reports = [queue.get() for _ in clients]
+            for client in clients:
+                client.join()
+
+        writes = [report for report in reports if report['writer']]
+        reads = [report for report in reports if not report['writer']]
+        write_latencies = sorted(ms for report in writes for ms in report['latencies'])
+        return {
+            'writes_per_s': sum(report['done'] for report in writes) / duration,
+            'reads_per_s': sum(report['done'] for report in reads) / duration,
+            'errors': sum(report['errors'] for report in reports),
+            'write_p95_ms': statistics.quantiles(write_latencies, n=20)[18] if len(write_latencies) > 1 else 0.0,
+        }
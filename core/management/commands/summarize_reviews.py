@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from core import summaries
+from core.models import Item
+
+class Command(BaseCommand):
+    help = 'Writes pros/cons review digests for items whose reviews changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Most items to summarize in this run')
+        parser.add_argument('--item', help='Only summarize the item with this slug')
+        parser.add_argument('--force', action='store_true', help='Regenerate even when the reviews are unchanged')
+        parser.add_argument('--backend', help='Dotted path of the client class (default: REVIEW_SUMMARY_BACKEND)')
+
+    def handle(self, *args, **options):
+        try:
+            client = summaries.get_client(options['backend'])
+        except ImportError as exc:
+            raise CommandError(f"Summary backend unavailable: {exc}")
+
+        if options['item']:
+            items = Item.objects.filter(slug=options['item'])
+            if not items.exists():
+                raise CommandError(f"No item with slug '{options['item']}'")
+        elif options['force']:
+            items = Item.objects.filter(review_count__gte=summaries.MIN_REVIEWS)
+        else:
+            items = summaries.pending_items()
+
+        generated, unchanged, failed = summaries.summarize_pending(
+            limit=options['limit'], client=client, force=options['force'], items=items
+        )
+        self.stdout.write(f"{generated} generated, {unchanged} unchanged, {failed} failed ({client.name})")
+        self.stdout.write(self.style.SUCCESS('Review summaries updated!'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import wallet
+
+class Command(BaseCommand):
+    help = 'Recomputes Profile token rewards and wallet balances from the ledger and reports drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted balances with the ledger totals')
+        parser.add_argument('--show', type=int, default=20, help='How many drifted profiles to list')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Verifying wallet ledger...")
+
+        drifted = wallet.drifted_profiles().select_related('user')
+        total = drifted.count()
+        for profile in drifted[:options['show']]:
+            self.stdout.write(
+                f" - {profile.user.username}: tokens {profile.token_rewards} (ledger {profile.ledger_tokens}), "
+                f"wallet {profile.balance} (ledger {profile.ledger_balance})"
+            )
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('All balances match the ledger!'))
+            return
+
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING(f'{total} profiles drifted. Re-run with --fix to rebuild them.'))
+            return
+
+        with transaction.atomic():
+            updated = wallet.rebuild_projection()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt balances for {updated} profiles ({total} had drifted).'))
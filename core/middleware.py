@@ -0,0 +1,212 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# Per-request instrumentation: every SQL statement and top-level template
+# render (through TimedDjangoTemplates, the TEMPLATES backend) is timed while
+# the request is handled, the totals are reported in a Server-Timing header
+# (visible in the browser's network panel; DEBUG only unless
+# SERVER_TIMING_HEADERS says otherwise), and requests over REQUEST_BUDGET_MS or REQUEST_QUERY_BUDGET are logged as JSON to
+# `core.slow_requests` together with their most repeated statements. Cached
+# fragments (the item cards) count their hits and misses here too.
+#
+# Both middlewares here work in either mode, so under ASGI a request reaches
+# the async views without Django switching to a thread for a sync middleware.
+
+slow_log = logging.getLogger('core.slow_requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = []          # (sql, params, milliseconds)
+        self.template_ms = 0.0
+        self._template_depth = 0
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, repr(params), (time.perf_counter() - started) * 1000))
+
+    @property
+    def sql_ms(self):
+        return sum(ms for _, _, ms in self.queries)
+
+    @property
+    def duplicates(self):
+        """Statements run again with exactly the same parameters."""
+        return len(self.queries) - len({(sql, params) for sql, params, _ in self.queries})
+
+    def repeated(self, limit=5):
+        """The SQL texts run most often, e.g. the per-row query of an N+1."""
+        counts = Counter(sql for sql, _, _ in self.queries)
+        totals = Counter()
+        for sql, _, ms in self.queries:
+            totals[sql] += ms
+        return [
+            {'sql': sql, 'count': count, 'ms': round(totals[sql], 2)}
+            for sql, count in counts.most_common(limit) if count > 1
+        ]
+
+
+def record_fragments(hits, misses):
+    """Count fragment cache lookups against the current request, if there is one."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.fragment_hits += hits
+        metrics.fragment_misses += misses
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Only the outermost render is counted; it already includes nested ones
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._template_depth -= 1
+            if not metrics._template_depth:
+                metrics.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with renders counted against the current request (TEMPLATES)."""
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = getattr(settings, 'SERVER_TIMING_HEADERS', settings.DEBUG)
+        self.budget_ms = getattr(settings, 'REQUEST_BUDGET_MS', 500)
+        self.query_budget = getattr(settings, 'REQUEST_QUERY_BUDGET', 50)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def instrument(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.instrument(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        self.add_timing(response, metrics, total_ms)
+        if self.is_slow(metrics, total_ms):
+            self.log_slow(request, response, metrics, total_ms, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        # The async ORM runs queries in the request's thread-sensitive thread,
+        # which has its own connections; wrap those
+        stack = ExitStack()
+        await sync_to_async(self.instrument)(stack, metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        self.add_timing(response, metrics, total_ms)
+        if self.is_slow(metrics, total_ms):
+            user = await request.auser() if hasattr(request, 'auser') else None
+            self.log_slow(request, response, metrics, total_ms, user)
+        return response
+
+    def add_timing(self, response, metrics, total_ms):
+        if not self.headers:
+            return
+        timings = [
+            f'sql;dur={metrics.sql_ms:.1f};desc="{len(metrics.queries)} queries, {metrics.duplicates} duplicates"',
+            f'template;dur={metrics.template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ]
+        if metrics.fragment_hits or metrics.fragment_misses:
+            timings.append(f'fragments;desc="{metrics.fragment_hits} hits, {metrics.fragment_misses} misses"')
+        response['Server-Timing'] = ', '.join(timings)
+
+    def is_slow(self, metrics, total_ms):
+        return total_ms > self.budget_ms or len(metrics.queries) > self.query_budget
+
+    def log_slow(self, request, response, metrics, total_ms, user):
+        slow_log.warning(json.dumps({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': user.pk if user is not None and user.is_authenticated else None,
+            'total_ms': round(total_ms, 1),
+            'sql_ms': round(metrics.sql_ms, 1),
+            'template_ms': round(metrics.template_ms, 1),
+            'queries': len(metrics.queries),
+            'duplicates': metrics.duplicates,
+            'fragment_hits': metrics.fragment_hits,
+            'fragment_misses': metrics.fragment_misses,
+            'repeated': metrics.repeated(),
+        }))
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, able to run in an async middleware chain (WhiteNoise itself is sync-only)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
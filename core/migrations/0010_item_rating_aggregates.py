@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:18
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    Review = apps.get_model('core', 'Review')
+    prior_mean, prior_weight = 3.0, 5
+
+    stats = Review.objects.values('item').annotate(n=Count('pk'), total=Sum('rating'))
+    items = []
+    for row in stats:
+        items.append(Item(
+            pk=row['item'],
+            review_count=row['n'],
+            rating_sum=row['total'],
+            weighted_rating=(prior_weight * prior_mean + row['total']) / (prior_weight + row['n']),
+        ))
+    Item.objects.bulk_update(items, ['review_count', 'rating_sum', 'weighted_rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_chatmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='weighted_rating',
+            field=models.FloatField(db_index=True, default=3.0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:40
+
+from django.db import migrations, OperationalError
+
+
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_item_fts USING fts5(
+        name, description, category, specs,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+POPULATE_SQL = """
+    INSERT INTO core_item_fts(rowid, name, description, category, specs)
+    SELECT i.id, i.name, i.description, c.name,
+           COALESCE((SELECT group_concat(value, ' ') FROM json_each(i.specifications)), '')
+    FROM core_item i
+    JOIN core_category c ON c.id = i.category_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL)
+    except OperationalError:
+        # SQLite built without FTS5: core.search falls back to icontains.
+        return
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS core_item_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_item_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
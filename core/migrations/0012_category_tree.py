@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_category_tree(apps, schema_editor):
+    Category = apps.get_model('core', 'Category')
+    Item = apps.get_model('core', 'Item')
+
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            parent = parents[pk]
+            paths[pk] = (path_of(parent) if parent else '') + f"{pk:010d}/"
+        return paths[pk]
+
+    for pk in parents:
+        path_of(pk)
+
+    direct = dict(Item.objects.values('category').annotate(n=Count('pk')).values_list('category', 'n'))
+    subtree = dict.fromkeys(parents, 0)
+    for pk, path in paths.items():
+        for ancestor in path.split('/')[:-1]:
+            subtree[int(ancestor)] += direct.get(pk, 0)
+
+    Category.objects.bulk_update(
+        [
+            Category(pk=pk, path=path, depth=path.count('/') - 1,
+                     item_count=direct.get(pk, 0), subtree_item_count=subtree[pk])
+            for pk, path in paths.items()
+        ],
+        ['path', 'depth', 'item_count', 'subtree_item_count'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_item_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='subtree_item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_category_tree, migrations.RunPython.noop),
+    ]
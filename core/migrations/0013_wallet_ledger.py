@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Existing balances become opening entries so the ledger starts in agreement
+    Profile = apps.get_model('core', 'Profile')
+    LedgerEntry = apps.get_model('core', 'LedgerEntry')
+    entries = []
+    for user_id, tokens, balance in Profile.objects.values_list('user_id', 'token_rewards', 'balance'):
+        if tokens:
+            entries.append(LedgerEntry(user_id=user_id, account='TOKENS', kind='OPENING', amount=tokens))
+        if balance:
+            entries.append(LedgerEntry(user_id=user_id, account='WALLET', kind='OPENING', amount=balance))
+    LedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_category_tree'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(choices=[('TOKENS', 'Token Rewards'), ('WALLET', 'Wallet Balance')], max_length=10)),
+                ('kind', models.CharField(choices=[('OPENING', 'Opening Balance'), ('REFERRAL_REWARD', 'Referral Reward'), ('REDEMPTION', 'Token Redemption'), ('PAYOUT', 'Payout Request'), ('PAYOUT_REFUND', 'Payout Refund'), ('ADJUSTMENT', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Ledger entries',
+                'indexes': [models.Index(fields=['user', 'account'], name='core_ledger_user_account_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reference', ''), _negated=True), fields=('account', 'kind', 'reference'), name='core_ledger_unique_reference')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
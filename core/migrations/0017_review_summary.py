@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_chat_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_hash', models.CharField(max_length=64)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('summary', models.TextField()),
+                ('pros', models.JSONField(blank=True, default=list)),
+                ('cons', models.JSONField(blank=True, default=list)),
+                ('backend', models.CharField(max_length=100)),
+                ('stale', models.BooleanField(db_index=True, default=False)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='core.item')),
+            ],
+            options={
+                'verbose_name_plural': 'Review summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_reviewer_stats(apps, schema_editor):
+    ReviewerStats = apps.get_model('core', 'ReviewerStats')
+    ReviewerDay = apps.get_model('core', 'ReviewerDay')
+    Review = apps.get_model('core', 'Review')
+    Referral = apps.get_model('core', 'Referral')
+
+    stats = {}
+    for row in Review.objects.order_by().values('author').annotate(n=Count('pk'), total=Sum('rating'), last=Max('created_at')):
+        stats[row['author']] = ReviewerStats(
+            user_id=row['author'], review_count=row['n'], rating_sum=row['total'], last_review_at=row['last']
+        )
+    for row in Referral.objects.order_by().values('referrer').annotate(n=Count('pk')):
+        stats.setdefault(row['referrer'], ReviewerStats(user_id=row['referrer'])).referral_count = row['n']
+    ReviewerStats.objects.bulk_create(stats.values(), batch_size=500)
+
+    days = Review.objects.order_by().annotate(day=TruncDate('created_at')).values('author', 'day').annotate(n=Count('pk'))
+    ReviewerDay.objects.bulk_create(
+        [ReviewerDay(user_id=row['author'], day=row['day'], review_count=row['n']) for row in days], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0018_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reviewer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('last_review_at', models.DateTimeField(blank=True, null=True)),
+                ('referral_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Reviewer stats',
+                'indexes': [models.Index(fields=['-review_count', 'user'], name='core_reviewer_top_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewerDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('review_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='core_reviewer_day_idx')],
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_reviewer_stats, migrations.RunPython.noop),
+    ]
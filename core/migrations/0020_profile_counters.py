@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-17 19:54
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_profile_counters(apps, schema_editor):
+    Profile = apps.get_model('core', 'Profile')
+    Referral = apps.get_model('core', 'Referral')
+    PayoutRequest = apps.get_model('core', 'PayoutRequest')
+    LedgerEntry = apps.get_model('core', 'LedgerEntry')
+
+    referrals = dict(Referral.objects.order_by().values('referrer').annotate(n=Count('pk')).values_list('referrer', 'n'))
+    earnings = dict(
+        LedgerEntry.objects.filter(kind__in=['OPENING', 'REFERRAL_REWARD'], amount__gt=0)
+        .order_by().values('user').annotate(total=Sum('amount')).values_list('user', 'total')
+    )
+    # Only requests booked as a PAYOUT are bank payouts; redemptions are stored as PAID requests too
+    bank = set(LedgerEntry.objects.filter(kind='PAYOUT').values_list('reference', flat=True))
+    pending, paid = defaultdict(Decimal), defaultdict(Decimal)
+    for pk, user_id, amount, status in PayoutRequest.objects.values_list('pk', 'user_id', 'amount', 'status').iterator():
+        if f'payoutrequest:{pk}' not in bank:
+            continue
+        if status in ('PENDING', 'PROCESSING'):
+            pending[user_id] += amount
+        elif status == 'PAID':
+            paid[user_id] += amount
+
+    profiles = []
+    for profile in Profile.objects.only('pk', 'user_id').iterator():
+        profile.referral_count = referrals.get(profile.user_id, 0)
+        profile.lifetime_earnings = earnings.get(profile.user_id) or Decimal('0.00')
+        profile.pending_payout_total = pending[profile.user_id]
+        profile.paid_out_total = paid[profile.user_id]
+        profiles.append(profile)
+    Profile.objects.bulk_update(
+        profiles, ['referral_count', 'lifetime_earnings', 'pending_payout_total', 'paid_out_total'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_reviewer_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='lifetime_earnings',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='paid_out_total',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='pending_payout_total',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='referral_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_profile_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='token_rewards',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+    ]
@@ -1,5 +1,11 @@
-from django.db import models
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Concat, Substr, TruncDate
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import slugify
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -7,18 +13,172 @@ from django.dispatch import receiver
 # --- EXISTING MODELS ---
 
 class Category(models.Model):
+    # Materialized path: one zero-padded pk per level, each ending in '/'.
+    # '/' sorts just below '0', so a subtree is the range [path, path[:-1] + '0').
+    PATH_STEP = 10
+
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     parent = models.ForeignKey('self', null=True, blank=True, related_name='children', on_delete=models.CASCADE)
     icon = models.ImageField(upload_to='category_icons/', blank=True, null=True)
 
+    path = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    subtree_item_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Maintained by the Item signals in core/signals.py and by rebuild_tree
+    COUNT_FIELDS = ('item_count', 'subtree_item_count')
+
     class Meta:
         verbose_name_plural = "Categories"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    @classmethod
+    def path_segment(cls, pk):
+        return f"{pk:0{cls.PATH_STEP}d}/"
+
+    @staticmethod
+    def subtree_range(path, prefix=''):
+        """Q for every node whose path lies in the subtree rooted at `path`."""
+        return Q(**{f'{prefix}path__gte': path, f'{prefix}path__lt': path[:-1] + '0'})
+
+    @staticmethod
+    def ids_from_path(path):
+        return [int(segment) for segment in path.split('/') if segment]
+
+    def descendants(self, include_self=True):
+        nodes = Category.objects.filter(self.subtree_range(self.path))
+        return nodes if include_self else nodes.exclude(pk=self.pk)
+
+    def subtree_items(self):
+        return Item.objects.filter(self.subtree_range(self.path, prefix='category__'))
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+            if self.pk in self.ids_from_path(parent_path):
+                raise ValidationError({'parent': "A category cannot be moved under itself or one of its subcategories."})
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            is_new = self.pk is None
+            moved = not is_new and self.parent_id != getattr(self, '_stored_parent_id', self.parent_id)
+            parent_path = ''
+            if self.parent_id:
+                parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).get()
+            if moved and self.pk in self.ids_from_path(parent_path):
+                raise ValueError("A category cannot be moved under itself or one of its subcategories.")
+
+            # A plain save() of a loaded category (a rename, the admin) must not
+            # write back item counts that have moved since it was read
+            if not is_new and not self._state.adding and kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    f.name for f in self._meta.concrete_fields
+                    if not f.primary_key and f.name not in self.COUNT_FIELDS
+                ]
+            super().save(*args, **kwargs)
+
+            new_path = parent_path + self.path_segment(self.pk)
+            new_depth = len(self.ids_from_path(parent_path))
+            if moved:
+                self._move_subtree(new_path, new_depth)
+            elif self.path != new_path:
+                Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            self.path, self.depth = new_path, new_depth
+            self._stored_parent_id = self.parent_id
+
+    def _move_subtree(self, new_path, new_depth):
+        old_path, old_depth, moved_items = Category.objects.filter(pk=self.pk).values_list(
+            'path', 'depth', 'subtree_item_count'
+        ).get()
+
+        # Take the subtree's items away from the old ancestors and give them to the new ones
+        old_ancestors = self.ids_from_path(old_path)[:-1]
+        new_ancestors = self.ids_from_path(new_path)[:-1]
+        if moved_items:
+            Category.objects.filter(pk__in=old_ancestors, subtree_item_count__gte=moved_items).update(
+                subtree_item_count=F('subtree_item_count') - moved_items
+            )
+            Category.objects.filter(pk__in=new_ancestors).update(subtree_item_count=F('subtree_item_count') + moved_items)
+
+        # Re-root every node below in one UPDATE
+        Category.objects.filter(self.subtree_range(old_path)).update(
+            path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+            depth=F('depth') + (new_depth - old_depth),
+        )
+
+    @classmethod
+    def adjust_item_counts(cls, category_id, delta):
+        """Add `delta` items to a category's direct count and to every ancestor's subtree count."""
+        path = cls.objects.filter(pk=category_id).values_list('path', flat=True).first()
+        if path is None:
+            return
+        nodes = cls.objects.filter(pk__in=cls.ids_from_path(path) or [category_id])
+        if delta < 0:
+            # Counts never go below zero; a drifted row is left for `rebuild_category_tree`
+            nodes = nodes.filter(Q(subtree_item_count__gte=-delta), ~Q(pk=category_id) | Q(item_count__gte=-delta))
+        nodes.update(
+            subtree_item_count=F('subtree_item_count') + delta,
+            item_count=Case(
+                When(pk=category_id, then=F('item_count') + delta),
+                default=F('item_count'),
+                output_field=models.PositiveIntegerField(),
+            ),
+        )
+
+    @classmethod
+    def rebuild_tree(cls, batch_size=1000):
+        """Recompute every path, depth and item count from `parent` and the Item table."""
+        parents = dict(cls.objects.values_list('pk', 'parent_id'))
+        paths = {}
+
+        def path_of(pk):
+            # Iterative walk up to the first node with a known path, so deep trees don't recurse
+            chain = []
+            while pk is not None and pk not in paths:
+                chain.append(pk)
+                pk = parents[pk]
+            prefix = paths.get(pk, '')
+            for node in reversed(chain):
+                prefix += cls.path_segment(node)
+                paths[node] = prefix
+            return paths[chain[0]] if chain else prefix
+
+        for pk in parents:
+            path_of(pk)
+
+        direct = dict(
+            Item.objects.order_by().values('category').annotate(n=Count('pk')).values_list('category', 'n')
+        )
+        subtree = dict.fromkeys(parents, 0)
+        for pk, path in paths.items():
+            for ancestor in cls.ids_from_path(path):
+                subtree[ancestor] += direct.get(pk, 0)
+
+        nodes = [
+            cls(
+                pk=pk,
+                path=path,
+                depth=path.count('/') - 1,
+                item_count=direct.get(pk, 0),
+                subtree_item_count=subtree[pk],
+            )
+            for pk, path in paths.items()
+        ]
+        with transaction.atomic():
+            cls.objects.bulk_update(nodes, ['path', 'depth', 'item_count', 'subtree_item_count'], batch_size=batch_size)
+        return len(nodes)
 
     def __str__(self):
         return self.name
@@ -34,18 +194,92 @@ class Item(models.Model):
     website = models.URLField(blank=True, null=True)
     affiliate_link = models.URLField(blank=True, null=True)
     image = models.ImageField(upload_to='item_images/', blank=True, null=True)
+    # Resized WebP/JPEG copies of `image`, written by core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     specifications = models.JSONField(default=dict, blank=True) 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also moved by apply_review_delta, since the page shows the aggregates
+    updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
 
+    # Bayesian prior: an item with few reviews is pulled towards this mean
+    RATING_PRIOR_MEAN = 3.0
+    RATING_PRIOR_WEIGHT = 5
+
+    # Review aggregates, maintained by the Review signals in core/signals.py
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    weighted_rating = models.FloatField(default=RATING_PRIOR_MEAN, editable=False, db_index=True)
+
+    AGGREGATE_FIELDS = ('review_count', 'rating_sum', 'weighted_rating')
+    # Written by core.images once the resized copies exist
+    DERIVED_FIELDS = ('image_variants',)
+
+    class Meta:
+        # Found by `manage.py audit_indexes`; the featured index only holds featured rows
+        indexes = [
+            models.Index(fields=['-created_at'], name='core_item_created_idx'),
+            models.Index(fields=['-created_at'], condition=Q(is_featured=True), name='core_item_featured_idx'),
+            # The API's sync cursor walks items in (updated_at, id) order
+            models.Index(fields=['updated_at'], name='core_item_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_category_id = instance.__dict__.get('category_id')
+        instance._stored_featured = instance.__dict__.get('is_featured')
+        instance._stored_image = instance.__dict__.get('image')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        # A plain save() of a loaded item (an edit, the admin) must not write
+        # back aggregates or variants that have moved since it was read
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.AGGREGATE_FIELDS + self.DERIVED_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+    @property
+    def avg_rating(self):
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
+    @classmethod
+    def weighted_rating_expression(cls, count, total):
+        """(C * m + sum) / (C + n), built from expressions for count and sum."""
+        return ExpressionWrapper(
+            (Value(cls.RATING_PRIOR_WEIGHT * cls.RATING_PRIOR_MEAN) + total)
+            / (Value(float(cls.RATING_PRIOR_WEIGHT)) + count),
+            output_field=models.FloatField(),
+        )
+
+    @classmethod
+    def apply_review_delta(cls, item_id, count_delta, sum_delta):
+        """Shift an item's stored aggregates in a single UPDATE."""
+        # Aggregates never go below zero; a drifted row is left for `reconcile_ratings`
+        items = cls.objects.filter(pk=item_id)
+        if count_delta < 0:
+            items = items.filter(review_count__gte=-count_delta)
+        if sum_delta < 0:
+            items = items.filter(rating_sum__gte=-sum_delta)
+        new_count = F('review_count') + count_delta
+        new_sum = F('rating_sum') + sum_delta
+        items.update(
+            review_count=new_count,
+            rating_sum=new_sum,
+            weighted_rating=cls.weighted_rating_expression(new_count, new_sum),
+            updated_at=timezone.now(),
+        )
+
 class Review(models.Model):
     item = models.ForeignKey(Item, related_name='reviews', on_delete=models.CASCADE)
     author = models.ForeignKey(User, related_name='reviews', on_delete=models.CASCADE)
@@ -53,31 +287,221 @@ class Review(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ('item', 'author')
+        indexes = [
+            models.Index(fields=['item', '-created_at'], name='core_review_item_created_idx'),
+            # The item page validator reads an item's most recently changed review
+            models.Index(fields=['item', '-updated_at'], name='core_review_item_updated_idx'),
+            # The home page takes the first featured review by pk
+            models.Index(fields=['id'], condition=Q(is_featured=True), name='core_review_featured_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_stored_state()
+        instance._stored_featured = instance.__dict__.get('is_featured')
+        return instance
+
+    def remember_stored_state(self):
+        # What the aggregates on Item currently account for; used by the
+        # signals to apply the right delta when a review is edited or moved.
+        self._stored_rating = (self.__dict__.get('item_id'), self.__dict__.get('rating'))
 
     def __str__(self):
         return f"{self.item.name} - {self.rating} stars"
 
+class ReviewSummary(models.Model):
+    """A generated pros/cons digest of an item's reviews; see core.summaries."""
+    item = models.OneToOneField(Item, related_name='summary', on_delete=models.CASCADE)
+    # sha256 of the review set the digest was written from
+    review_hash = models.CharField(max_length=64)
+    review_count = models.PositiveIntegerField(default=0)
+    summary = models.TextField()
+    pros = models.JSONField(default=list, blank=True)
+    cons = models.JSONField(default=list, blank=True)
+    backend = models.CharField(max_length=100)
+    # Set by the review signals; cleared once the batch has looked at the item again
+    stale = models.BooleanField(default=False, db_index=True)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Review summaries"
+
+    def __str__(self):
+        return f"Summary of {self.item}"
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     image = models.ImageField(default='default.jpg', upload_to='profile_pics')
-    token_rewards = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Projections of the ledger, moved only by core.wallet
+    token_rewards = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, editable=False)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, editable=False)
+
+    # Dashboard counters, shifted in the same transaction as the change they
+    # count (core.wallet, core.payouts, the Referral signals); rebuilt from
+    # the ledger by wallet.rebuild_projection
+    referral_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_payout_total = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, editable=False)
+    paid_out_total = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, editable=False)
+    lifetime_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, editable=False)
+
+    COUNTER_FIELDS = ('referral_count', 'pending_payout_total', 'paid_out_total', 'lifetime_earnings')
+    ACCOUNT_FIELDS = ('token_rewards', 'balance')
+    # Written by core.images once the resized copies exist
+    DERIVED_FIELDS = ('image_variants',)
+    # Every column kept up to date with queryset updates rather than by saving the profile
+    MAINTAINED_FIELDS = COUNTER_FIELDS + ACCOUNT_FIELDS + DERIVED_FIELDS
 
     def __str__(self):
         return f'{self.user.username} Profile'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_image = instance.__dict__.get('image')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # A plain save() of a loaded profile (e.g. save_profile on every User save) must
+        # not write back balances, counters or variants that have moved since it was read
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 class Referral(models.Model):
     referrer = models.ForeignKey(User, related_name='referrals_made', on_delete=models.CASCADE)
     referred_user = models.OneToOneField(User, related_name='referred_by', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['referrer', '-created_at'], name='core_referral_referrer_idx'),
+        ]
+
     def __str__(self):
         return f"{self.referrer.username} invited {self.referred_user.username}"
 
+def add_to_counters(model, lookup, **deltas):
+    """Add `deltas` to the counter columns of the row matching `lookup`, creating it first if missing."""
+    # Counters never go below zero; a drifted row is left for the rebuild commands
+    rows = model.objects.filter(**lookup, **{f'{name}__gte': -delta for name, delta in deltas.items() if delta < 0})
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    # A missing row is only created to count up; when a user is being deleted their
+    # stats may already be gone, and recreating them would break the cascade
+    if rows.update(**changes) or not any(delta > 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{name: max(delta, 0) for name, delta in deltas.items()})
+    except IntegrityError:  # created concurrently; add to that row instead
+        rows.update(**changes)
+
+class ReviewerStats(models.Model):
+    """Per-user totals behind the reviewer leaderboard, maintained by the signals in core/signals.py."""
+    user = models.OneToOneField(User, primary_key=True, related_name='reviewer_stats', on_delete=models.CASCADE)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    last_review_at = models.DateTimeField(null=True, blank=True)
+    referral_count = models.PositiveIntegerField(default=0)
+
+    LEADERBOARD_WINDOWS = {'all': None, '30d': 30}
+
+    class Meta:
+        verbose_name_plural = "Reviewer stats"
+        indexes = [
+            models.Index(fields=['-review_count', 'user'], name='core_reviewer_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} ({self.review_count} reviews)"
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @classmethod
+    def apply_review_delta(cls, user_id, count_delta, sum_delta, reviewed_at=None):
+        add_to_counters(cls, {'user_id': user_id}, review_count=count_delta, rating_sum=sum_delta)
+        if reviewed_at is not None:
+            cls.objects.filter(pk=user_id).update(last_review_at=reviewed_at)
+            add_to_counters(ReviewerDay, {'user_id': user_id, 'day': timezone.localdate(reviewed_at)},
+                            review_count=count_delta)
+
+    @classmethod
+    def forget_review(cls, review):
+        """Undo a deleted review: its counts, its day bucket and possibly the last review time."""
+        cls.apply_review_delta(review.author_id, -1, -int(review.rating))
+        ReviewerDay.objects.filter(
+            user_id=review.author_id, day=timezone.localdate(review.created_at)
+        ).update(review_count=F('review_count') - 1)
+        latest = Review.objects.filter(author_id=review.author_id).order_by('-created_at').values('created_at')[:1]
+        cls.objects.filter(pk=review.author_id).update(last_review_at=models.Subquery(latest))
+
+    @classmethod
+    def leaderboard(cls, window='all', limit=4):
+        """Top reviewers, all time or over the last N days; each carries `window_reviews`."""
+        days = cls.LEADERBOARD_WINDOWS[window]
+        if days is None:
+            top = list(cls.objects.filter(review_count__gt=0).select_related('user').order_by('-review_count', 'user')[:limit])
+            for stats in top:
+                stats.window_reviews = stats.review_count
+            return top
+
+        since = timezone.localdate() - timedelta(days=days - 1)
+        counts = dict(
+            ReviewerDay.objects.filter(day__gte=since).values('user')
+            .annotate(n=Sum('review_count')).filter(n__gt=0).order_by('-n', 'user').values_list('user', 'n')[:limit]
+        )
+        top = cls.objects.filter(pk__in=counts).select_related('user')
+        for stats in top:
+            stats.window_reviews = counts[stats.pk]
+        return sorted(top, key=lambda stats: (-stats.window_reviews, stats.pk))
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recompute every row and day bucket from the Review and Referral tables."""
+        reviews = Review.objects.order_by().values('author').annotate(
+            n=Count('pk'), total=Sum('rating'), last=models.Max('created_at')
+        )
+        referrals = dict(Referral.objects.order_by().values('referrer').annotate(n=Count('pk')).values_list('referrer', 'n'))
+        stats = {
+            row['author']: cls(user_id=row['author'], review_count=row['n'], rating_sum=row['total'], last_review_at=row['last'])
+            for row in reviews
+        }
+        for user_id, count in referrals.items():
+            stats.setdefault(user_id, cls(user_id=user_id)).referral_count = count
+        days = [
+            ReviewerDay(user_id=row['author'], day=row['day'], review_count=row['n'])
+            for row in Review.objects.order_by().annotate(day=TruncDate('created_at')).values('author', 'day').annotate(n=Count('pk'))
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            ReviewerDay.objects.all().delete()
+            cls.objects.bulk_create(stats.values(), batch_size=batch_size)
+            ReviewerDay.objects.bulk_create(days, batch_size=batch_size)
+        return len(stats), len(days)
+
+class ReviewerDay(models.Model):
+    """Reviews a user wrote on one day; summed over a range for the rolling leaderboards."""
+    user = models.ForeignKey(User, related_name='review_days', on_delete=models.CASCADE)
+    day = models.DateField()
+    review_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='core_reviewer_day_idx'),
+        ]
+
 class PayoutRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -109,18 +533,147 @@ class PayoutRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='core_payout_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='core_payout_status_idx'),
+        ]
+
+    # Allowed status changes; PAID and CANCELLED are final
+    TRANSITIONS = {
+        'PENDING': {'PROCESSING', 'PAID', 'CANCELLED'},
+        'PROCESSING': {'PAID', 'CANCELLED'},
+        'PAID': set(),
+        'CANCELLED': set(),
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_status = instance.__dict__.get('status')
+        return instance
+
+    @classmethod
+    def sources_for(cls, target):
+        return [status for status, targets in cls.TRANSITIONS.items() if target in targets]
+
+    def _transition_error(self):
+        old_status = getattr(self, '_stored_status', None)
+        if old_status and self.status != old_status and self.status not in self.TRANSITIONS[old_status]:
+            return f"A {old_status.lower()} request cannot be moved to {self.status.lower()}."
+        return None
+
+    def clean(self):
+        super().clean()
+        error = self._transition_error()
+        if error:
+            raise ValidationError({'status': error})
+
     def save(self, *args, **kwargs):
-        if self.pk:
-            old_status = PayoutRequest.objects.get(pk=self.pk).status
-            if self.status == 'CANCELLED' and old_status != 'CANCELLED':
-                profile = self.user.profile
-                profile.balance += self.amount
-                profile.save()
-        super().save(*args, **kwargs)
+        from .wallet import move_payout_totals, refund_payout
+
+        error = self._transition_error()
+        if error:
+            raise ValueError(error)
+
+        old_status = getattr(self, '_stored_status', None)
+        newly_cancelled = old_status is not None and self.status == 'CANCELLED' and old_status != 'CANCELLED'
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if newly_cancelled:
+                refund_payout(self)
+            if old_status is not None and self.status != old_status:
+                move_payout_totals([(self.user_id, self.amount)], old_status, self.status)
+        self._stored_status = self.status
 
     def __str__(self):
         return f"{self.user.username} - {self.amount} ({self.status})"
 
+class LedgerEntry(models.Model):
+    """
+    One append-only movement of money. Profile.token_rewards and Profile.balance
+    are a cached projection of these rows, written by core.wallet only.
+    """
+    TOKENS = 'TOKENS'
+    WALLET = 'WALLET'
+    ACCOUNT_CHOICES = [
+        (TOKENS, 'Token Rewards'),
+        (WALLET, 'Wallet Balance'),
+    ]
+
+    KIND_CHOICES = [
+        ('OPENING', 'Opening Balance'),
+        ('REFERRAL_REWARD', 'Referral Reward'),
+        ('REDEMPTION', 'Token Redemption'),
+        ('PAYOUT', 'Payout Request'),
+        ('PAYOUT_REFUND', 'Payout Refund'),
+        ('ADJUSTMENT', 'Adjustment'),
+    ]
+
+    user = models.ForeignKey(User, related_name='ledger_entries', on_delete=models.CASCADE)
+    account = models.CharField(max_length=10, choices=ACCOUNT_CHOICES)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Idempotency key such as "payout:42"; a given movement can only be booked once
+    reference = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Ledger entries"
+        indexes = [
+            models.Index(fields=['user', 'account'], name='core_ledger_user_account_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account', 'kind', 'reference'],
+                condition=~Q(reference=''),
+                name='core_ledger_unique_reference',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only.")
+
+    def __str__(self):
+        return f"{self.user.username} {self.account} {self.amount:+} ({self.kind})"
+
+# --- BACKGROUND JOBS ---
+
+class Job(models.Model):
+    """A unit of deferred work, claimed and run by `manage.py run_worker` (see core.jobs)."""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('DEAD', 'Dead'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
 # --- NEW CHAT MODEL ---
 
 class ChatMessage(models.Model):
@@ -129,6 +682,12 @@ class ChatMessage(models.Model):
     is_from_admin = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Conversation history is paged by (created_at, id) within one user
+            models.Index(fields=['user', 'created_at'], name='core_chat_user_created_idx'),
+        ]
+
     def __str__(self):
         sender = self.user.username if self.user else "Guest User"
         return f"Chat from {sender} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
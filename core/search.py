@@ -0,0 +1,217 @@
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Category, Item
+
+# Full-text search over items, backed by an SQLite FTS5 table that mirrors
+# Item name, description, category name and specification values. The table
+# is kept in sync by the Item/Category signals in core/signals.py and can be
+# rebuilt from scratch with `manage.py rebuild_search_index`. On databases
+# without FTS5 the search falls back to the old icontains scan.
+
+FTS_TABLE = 'core_item_fts'
+
+# bm25() column weights, in table column order: name, description, category, specs
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+MAX_QUERY_TOKENS = 8
+SNIPPET_TOKENS = 16
+
+# Control characters that survive HTML escaping and become <mark> tags afterwards
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, category, specs,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+
+def _source_select(where=''):
+    # One row per item in the shape of the FTS table; specification values
+    # are flattened with json_each so the whole sync stays inside SQLite.
+    return f"""
+        SELECT i.id, i.name, i.description, c.name,
+               COALESCE((SELECT group_concat(value, ' ') FROM json_each(i.specifications)), '')
+        FROM {Item._meta.db_table} i
+        JOIN {Category._meta.db_table} c ON c.id = i.category_id
+        {where}
+    """
+
+
+_fts_available = None
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+# --- INDEX MAINTENANCE ---
+
+def index_items(item_ids):
+    if not item_ids or not fts_available():
+        return
+    item_ids = list(item_ids)
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", item_ids)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description, category, specs) "
+            + _source_select(f"WHERE i.id IN ({placeholders})"),
+            item_ids,
+        )
+
+
+def unindex_items(item_ids):
+    if not item_ids or not fts_available():
+        return
+    item_ids = list(item_ids)
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", item_ids)
+
+
+def reindex_category(category_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+            f"(SELECT id FROM {Item._meta.db_table} WHERE category_id = %s)",
+            [category_id],
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description, category, specs) "
+            + _source_select("WHERE i.category_id = %s"),
+            [category_id],
+        )
+
+
+def rebuild_index(chunk_size=20000, progress=None):
+    """Refill the whole index in id-range chunks; returns the number of rows indexed."""
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {Item._meta.db_table}")
+        max_id = cursor.fetchone()[0]
+        indexed = 0
+        for low in range(0, max_id, chunk_size):
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, description, category, specs) "
+                + _source_select("WHERE i.id > %s AND i.id <= %s"),
+                [low, low + chunk_size],
+            )
+            indexed += max(cursor.rowcount, 0)
+            if progress:
+                progress(indexed)
+
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+    global _fts_available
+    _fts_available = None
+    return indexed
+
+
+# --- QUERYING ---
+
+def build_match_expression(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    tokens = _TOKEN_RE.findall(query)[:MAX_QUERY_TOKENS]
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _highlight(raw_snippet):
+    html = escape(raw_snippet).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+    return mark_safe(html)
+
+
+class ItemSearch:
+    """
+    A lazily evaluated, relevance-ordered result set that Paginator can slice.
+
+    Only the requested page is fetched from the index; the matching Item rows
+    are then loaded in one query and returned with `snippet` and `rank` set.
+    """
+
+    def __init__(self, match):
+        self.match = match
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.match])
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if stop <= start:
+            return []
+
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT rowid,
+                       snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_TOKENS}),
+                       bm25({FTS_TABLE}, {weights}) AS score
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY score
+                LIMIT %s OFFSET %s
+                """,
+                [_MARK_OPEN, _MARK_CLOSE, self.match, stop - start, start],
+            )
+            hits = cursor.fetchall()
+
+        items = Item.objects.select_related('category').in_bulk([row[0] for row in hits])
+        results = []
+        for item_id, snippet, rank in hits:
+            item = items.get(item_id)
+            if item is None:  # index row left behind by a bulk delete
+                continue
+            item.snippet = _highlight(snippet)
+            item.rank = rank
+            results.append(item)
+        return results
+
+
+def search_items(query):
+    """Relevance-ranked items for `query`, ready to hand to a Paginator."""
+    match = build_match_expression(query)
+    if not match:
+        return []
+
+    if fts_available():
+        try:
+            search = ItemSearch(match)
+            search.count()
+            return search
+        except OperationalError:
+            pass
+
+    return (
+        Item.objects.select_related('category')
+        .filter(Q(name__icontains=query) | Q(description__icontains=query))
+        .order_by('-weighted_rating', '-pk')
+    )
@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import caching, homepage, images, jobs, search, summaries
+from .models import Category, Item, Profile, Referral, Review, ReviewerStats, ReviewSummary, add_to_counters
+
+# --- REVIEW DIGESTS ---
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def flag_review_summary(sender, instance, raw=False, **kwargs):
+    # Connected before the aggregate receivers below, which overwrite `_stored_rating`
+    if raw:
+        return
+    item_ids = {instance.item_id, getattr(instance, '_stored_rating', (None, None))[0]} - {None}
+    ReviewSummary.objects.filter(item_id__in=item_ids, stale=False).update(stale=True)
+    # One delayed batch picks up a burst of reviews instead of a job per review;
+    # queued after the commit, so a rolled-back save can't leave the batch marked as queued
+    transaction.on_commit(summaries.schedule_batch)
+
+# --- REVIEW AGGREGATES ON ITEM AND REVIEWER ---
+
+@receiver(post_save, sender=Review)
+def update_item_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    rating = int(instance.rating)
+    old_item_id, old_rating = getattr(instance, '_stored_rating', (None, None))
+
+    if created:
+        Item.apply_review_delta(instance.item_id, 1, rating)
+        ReviewerStats.apply_review_delta(instance.author_id, 1, rating, reviewed_at=instance.created_at)
+    elif old_item_id is None:
+        # Unknown previous state (e.g. an unsaved instance given an existing pk);
+        # left to `reconcile_ratings` and `rebuild_reviewer_stats` rather than guessing.
+        pass
+    elif old_item_id == instance.item_id:
+        if old_rating != rating:
+            Item.apply_review_delta(instance.item_id, 0, rating - old_rating)
+            ReviewerStats.apply_review_delta(instance.author_id, 0, rating - old_rating)
+    else:
+        Item.apply_review_delta(old_item_id, -1, -old_rating)
+        Item.apply_review_delta(instance.item_id, 1, rating)
+        if old_rating != rating:
+            ReviewerStats.apply_review_delta(instance.author_id, 0, rating - old_rating)
+
+    instance._stored_rating = (instance.item_id, rating)
+
+@receiver(post_delete, sender=Review)
+def update_item_rating_on_delete(sender, instance, **kwargs):
+    item_id, rating = getattr(instance, '_stored_rating', (None, None))
+    if item_id is None:
+        item_id, rating = instance.item_id, instance.rating
+    Item.apply_review_delta(item_id, -1, -int(rating))
+    ReviewerStats.forget_review(instance)
+
+@receiver(post_save, sender=Referral)
+def count_referral_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        add_to_counters(ReviewerStats, {'user_id': instance.referrer_id}, referral_count=1)
+        Profile.objects.filter(user_id=instance.referrer_id).update(referral_count=F('referral_count') + 1)
+
+@receiver(post_delete, sender=Referral)
+def count_referral_on_delete(sender, instance, **kwargs):
+    add_to_counters(ReviewerStats, {'user_id': instance.referrer_id}, referral_count=-1)
+    Profile.objects.filter(user_id=instance.referrer_id, referral_count__gt=0).update(referral_count=F('referral_count') - 1)
+
+# --- SEARCH INDEX ---
+
+@receiver(post_save, sender=Item)
+def index_item_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_items([instance.pk])
+
+@receiver(post_delete, sender=Item)
+def unindex_item_on_delete(sender, instance, **kwargs):
+    search.unindex_items([instance.pk])
+
+@receiver(post_save, sender=Category)
+def reindex_category_on_save(sender, instance, created, raw=False, **kwargs):
+    # A new category has no items yet; a renamed one changes their `category` column.
+    if not raw and not created:
+        search.reindex_category(instance.pk)
+
+# --- CATEGORY ITEM COUNTS ---
+
+@receiver(post_save, sender=Item)
+def update_category_counts_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    old_category_id = getattr(instance, '_stored_category_id', None)
+    if created:
+        Category.adjust_item_counts(instance.category_id, 1)
+        caching.bump_namespace('category')
+    elif old_category_id is not None and old_category_id != instance.category_id:
+        Category.adjust_item_counts(old_category_id, -1)
+        Category.adjust_item_counts(instance.category_id, 1)
+        caching.bump_namespace('category')
+    instance._stored_category_id = instance.category_id
+
+@receiver(post_delete, sender=Item)
+def update_category_counts_on_delete(sender, instance, **kwargs):
+    Category.adjust_item_counts(getattr(instance, '_stored_category_id', None) or instance.category_id, -1)
+    caching.bump_namespace('category')
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_namespace(sender, instance, raw=False, **kwargs):
+    # Renames, moves, icons: anything cached from the tree is stale
+    if not raw:
+        caching.bump_namespace('category')
+
+# --- HOME PAGE SNAPSHOT ---
+
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Review)
+def rebuild_home_on_featured_change(sender, instance, raw=False, **kwargs):
+    # Featuring, unfeaturing or editing a featured row changes the home page
+    if raw:
+        return
+    if instance.is_featured or getattr(instance, '_stored_featured', False):
+        homepage.schedule_rebuild()
+    instance._stored_featured = instance.is_featured
+
+# --- IMAGE DERIVATIVES ---
+
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Profile)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    # Only for a new image: a stale instance's manifest may be out of date, but
+    # saving it neither writes the manifest back nor needs new variants
+    if raw:
+        return
+    changed = instance.image.name != getattr(instance, '_stored_image', None)
+    if changed and images.needs_variants(instance.image, instance.image_variants):
+        jobs.enqueue('generate_image_variants', model=sender._meta.label_lower, pk=instance.pk)
+    instance._stored_image = instance.image.name
+
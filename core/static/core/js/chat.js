@@ -0,0 +1,72 @@
+// Client for the support chat WebSocket (core/chat.py).
+//
+//   const chat = new VouchlyChat('/ws/chat/', {
+//       message(event) { ... },        // a live message
+//       history(page) { ... },         // {user, messages (newest first), next}
+//       conversations(list) { ... },   // staff console only
+//       status(state) { ... },         // 'open' | 'closed'
+//   });
+//   chat.send({type: 'message', text: 'Hello'});
+//
+// Reconnects with exponential backoff; messages sent while disconnected are
+// queued and delivered once the socket opens again.
+
+class VouchlyChat {
+    constructor(path, handlers) {
+        this.url = (location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + path;
+        this.handlers = handlers;
+        this.queue = [];
+        this.delay = 1000;
+        this.connect();
+    }
+
+    connect() {
+        this.socket = new WebSocket(this.url);
+        this.socket.onopen = () => {
+            this.delay = 1000;
+            this.emit('status', 'open');
+            this.queue.splice(0).forEach(payload => this.send(payload));
+        };
+        this.socket.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            this.emit(data.type, data.type === 'conversations' ? data.conversations : data);
+        };
+        this.socket.onclose = (event) => {
+            this.emit('status', 'closed');
+            if (event.code === 4403) return;  // not signed in, or not staff
+            setTimeout(() => this.connect(), this.delay);
+            this.delay = Math.min(this.delay * 2, 30000);
+        };
+    }
+
+    emit(type, payload) {
+        if (this.handlers[type]) this.handlers[type](payload);
+    }
+
+    send(payload) {
+        if (this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(JSON.stringify(payload));
+        } else {
+            this.queue.push(payload);
+        }
+    }
+}
+
+// Renders one message into a chat log element.
+function renderChatMessage(log, message, prepend) {
+    const row = document.createElement('div');
+    row.className = 'chat-msg ' + (message.from_staff ? 'chat-msg-staff' : 'chat-msg-user');
+    const bubble = document.createElement('div');
+    bubble.className = 'chat-bubble';
+    bubble.textContent = message.text;
+    const time = document.createElement('small');
+    time.className = 'chat-time';
+    time.textContent = new Date(message.created_at).toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
+    row.append(bubble, time);
+    if (prepend) {
+        log.prepend(row);
+    } else {
+        log.append(row);
+        log.scrollTop = log.scrollHeight;
+    }
+}
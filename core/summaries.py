@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import jobs
+from .models import Item, Review, ReviewSummary
+
+# Short pros/cons digests of an item's reviews, written in batches by the
+# `summarize_reviews` job and command and stored in ReviewSummary, so a page
+# view only ever reads a row. A digest is keyed by a hash of the review set:
+# review signals just flag it stale and schedule a batch BATCH_DELAY later, so
+# a burst of reviews shares one run; the batch regenerates a digest only if
+# the hash actually changed.
+#
+# The model is called through REVIEW_SUMMARY_BACKEND, any class with
+# `name` and `summarize(item, reviews)`; StubClient needs no network.
+
+logger = logging.getLogger(__name__)
+
+MIN_REVIEWS = 3             # fewer than this and there is nothing to summarize
+PROMPT_REVIEWS = 60         # newest reviews sent to the model
+PROMPT_REVIEW_CHARS = 400
+MAX_POINTS = 4
+BATCH_DELAY = timedelta(minutes=5)
+BATCH_QUEUED_KEY = 'summaries:batch-queued'
+
+
+class SummaryError(Exception):
+    pass
+
+
+def review_set_hash(reviews):
+    payload = json.dumps(
+        [[r['pk'], r['rating'], r['title'], r['content']] for r in sorted(reviews, key=lambda r: r['pk'])]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def build_prompt(item, reviews):
+    lines = [
+        f"Summarize customer reviews of \"{item.name}\" for shoppers.",
+        "Reply with JSON only: {\"summary\": one or two sentences, "
+        f"\"pros\": up to {MAX_POINTS} short phrases, \"cons\": up to {MAX_POINTS} short phrases}}.",
+        "Reviews (rating out of 5):",
+    ]
+    for review in reviews:
+        text = f"{review['title']}. {review['content']}"[:PROMPT_REVIEW_CHARS]
+        lines.append(f"- [{review['rating']}] {text}")
+    return '\n'.join(lines)
+
+
+def parse_digest(text):
+    try:
+        data = json.loads(text)
+        return {
+            'summary': str(data['summary']).strip(),
+            'pros': [str(point).strip() for point in data.get('pros', [])][:MAX_POINTS],
+            'cons': [str(point).strip() for point in data.get('cons', [])][:MAX_POINTS],
+        }
+    except (ValueError, KeyError, TypeError) as exc:
+        raise SummaryError(f"Unusable model response: {text[:200]!r}") from exc
+
+
+# --- BACKENDS ---
+
+class StubClient:
+    """Deterministic, offline digest built from the reviews themselves; for tests and local data."""
+    name = 'stub'
+
+    def summarize(self, item, reviews):
+        positive = [r for r in reviews if r['rating'] >= 4]
+        negative = [r for r in reviews if r['rating'] <= 2]
+        return {
+            'summary': f"{len(positive)} of {len(reviews)} recent reviewers rate {item.name} 4 stars or more.",
+            'pros': list(dict.fromkeys(r['title'] for r in positive))[:MAX_POINTS],
+            'cons': list(dict.fromkeys(r['title'] for r in negative))[:MAX_POINTS],
+        }
+
+
+class GeminiClient:
+    def __init__(self, api_key=None, model=None):
+        from google import genai  # only needed when this backend is configured
+
+        self.client = genai.Client(api_key=api_key or settings.GEMINI_API_KEY)
+        self.model = model or settings.REVIEW_SUMMARY_MODEL
+        self.name = f"gemini:{self.model}"
+
+    def summarize(self, item, reviews):
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=build_prompt(item, reviews),
+            config={'response_mime_type': 'application/json', 'temperature': 0.2},
+        )
+        return parse_digest(response.text or '')
+
+
+def get_client(path=None):
+    return import_string(path or settings.REVIEW_SUMMARY_BACKEND)()
+
+
+# --- BATCH ---
+
+def schedule_batch():
+    """Queue a `summarize_reviews` run BATCH_DELAY from now, unless one queued since is still to come."""
+    # The cache entry lives as long as that run is waiting, so the reviews of a
+    # burst skip the lookup for it; once it is due, the next review queues another
+    if cache.add(BATCH_QUEUED_KEY, True, BATCH_DELAY.total_seconds()):
+        jobs.enqueue_unique('summarize_reviews', run_at=timezone.now() + BATCH_DELAY)
+
+
+def pending_items():
+    """Items with enough reviews whose digest is missing or flagged stale."""
+    return Item.objects.filter(review_count__gte=MIN_REVIEWS).filter(
+        Q(summary__isnull=True) | Q(summary__stale=True)
+    )
+
+
+def summarize_item(item, client, force=False):
+    """Write the digest for `item` if its reviews changed; returns True if the model was called."""
+    reviews = list(Review.objects.filter(item=item).values('pk', 'rating', 'title', 'content'))
+    digest_hash = review_set_hash(reviews)
+    existing = ReviewSummary.objects.filter(item=item).first()
+    if existing and existing.review_hash == digest_hash and not force:
+        if existing.stale:
+            ReviewSummary.objects.filter(pk=existing.pk).update(stale=False)
+        return False
+
+    newest = sorted(reviews, key=lambda r: r['pk'], reverse=True)[:PROMPT_REVIEWS]
+    digest = client.summarize(item, newest)
+    ReviewSummary.objects.update_or_create(item=item, defaults={
+        'review_hash': digest_hash,
+        'review_count': len(reviews),
+        'summary': digest['summary'],
+        'pros': digest['pros'],
+        'cons': digest['cons'],
+        'backend': client.name,
+        # A review added while the model was working leaves it stale for the next run
+        'stale': Review.objects.filter(item=item).count() != len(reviews),
+    })
+    return True
+
+
+def summarize_pending(limit=100, client=None, force=False, items=None):
+    """Run one batch; returns (generated, unchanged, failed)."""
+    client = client or get_client()
+    items = (items if items is not None else pending_items()).order_by('-review_count', 'pk')[:limit]
+    generated = unchanged = failed = 0
+    for item in items:
+        try:
+            if summarize_item(item, client, force=force):
+                generated += 1
+            else:
+                unchanged += 1
+        except Exception:
+            logger.exception("Could not summarize reviews of item %s", item.pk)
+            failed += 1
+    return generated, unchanged, failed
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from . import homepage, images, jobs, summaries, wallet
+from .fetch import MediaFetcher
+from .mail import deserialize_message
+from .models import Item, Referral
+
+# Handlers for the background job queue (core.jobs). Each must be safe to run
+# more than once, since a failed or interrupted job is retried.
+
+
+@jobs.register('reward_referral')
+def reward_referral(referral_id):
+    # The ledger's unique reference makes a retried reward a no-op
+    referral = Referral.objects.select_related('referrer').get(pk=referral_id)
+    wallet.reward_referral(referral)
+
+
+@jobs.register('send_email', max_attempts=8, sensitive=True)
+def send_email(message):
+    with get_connection(settings.QUEUED_EMAIL_BACKEND) as connection:
+        deserialize_message(message, connection=connection).send()
+
+
+@jobs.register('fetch_item_image', max_attempts=3)
+def fetch_item_image(item_id, url):
+    item = Item.objects.get(pk=item_id)
+    if item.image:
+        return
+    name = MediaFetcher().store(url, Item._meta.get_field('image').upload_to)
+    if name is None:
+        raise RuntimeError(f"Could not fetch {url}")
+    item.image.name = name
+    item.save(update_fields=['image'])
+
+
+@jobs.register('generate_image_variants', max_attempts=3)
+def generate_image_variants(model, pk):
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    if instance is not None:
+        images.refresh_variants(instance)
+
+
+@jobs.register('summarize_reviews', max_attempts=3)
+def summarize_reviews(limit=50):
+    generated, unchanged, _ = summaries.summarize_pending(limit=limit)
+    # Work through a large backlog in slices, but don't spin on items that keep failing
+    if generated + unchanged and summaries.pending_items().exists():
+        jobs.enqueue_unique('summarize_reviews')
+
+
+@jobs.register('build_home_snapshot', max_attempts=3)
+def build_home_snapshot():
+    homepage.build_snapshot()
+    # Run again on this row, unless a rebuild was queued while this one ran
+    run_at = timezone.now() + timedelta(seconds=settings.HOME_SNAPSHOT_SECONDS)
+    if not homepage.move_queued_rebuild(run_at):
+        return run_at
@@ -0,0 +1,88 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.defaultfilters import truncatewords
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from core.middleware import record_fragments
+
+register = template.Library()
+
+# Item cards as the home, category and search listings show them, rendered
+# once per item and kept in the cache. A card's key carries the item's
+# updated_at (bumped by every save and by each review's rating delta, see
+# Item.apply_review_delta), the category's for cards that name it, and a hash
+# of the card template, so an edit makes the next listing render a fresh card
+# and stale ones are simply never read again. A listing fetches all of its
+# cards with one get_many. Hits and misses show up in the Server-Timing header.
+
+CARDS = {
+    # variant: (template, shows the category name)
+    'premium': ('core/cards/premium.html', False),
+    'listing': ('core/cards/listing.html', False),
+    'search': ('core/cards/search.html', True),
+}
+
+# Where a card shows per-request text (the search snippet), filled in after the cache
+TEXT_SLOT = '\x00text\x00'
+
+
+def _card_key(item, variant, template_version):
+    version = f'{item.updated_at.timestamp():.6f}'
+    if CARDS[variant][1]:
+        version += f'.{item.category.updated_at.timestamp():.6f}'
+    return f'card:{variant}:{item.pk}:{version}:{template_version}'
+
+
+def _card_text(item):
+    snippet = getattr(item, 'snippet', None)
+    return conditional_escape(snippet or truncatewords(item.description, 12))
+
+
+def render_cards(items, variant):
+    card_template = get_template(CARDS[variant][0])
+    template_version = hashlib.md5(card_template.template.source.encode()).hexdigest()[:8]
+    items = list(items)
+    keys = [_card_key(item, variant, template_version) for item in items]
+
+    cached = cache.get_many(keys)
+    rendered = {}
+    for item, key in zip(items, keys):
+        if key not in cached and key not in rendered:
+            rendered[key] = card_template.render({'item': item, 'text': TEXT_SLOT})
+    if rendered:
+        cache.set_many(rendered, settings.CARD_CACHE_SECONDS)
+    record_fragments(hits=len(items) - len(rendered), misses=len(rendered))
+
+    cards = []
+    for item, key in zip(items, keys):
+        html = cached[key] if key in cached else rendered[key]
+        if TEXT_SLOT in html:
+            html = html.replace(TEXT_SLOT, _card_text(item))
+        cards.append(mark_safe(html))
+    return cards
+
+
+@register.simple_tag
+def item_cards(items, variant):
+    """
+    The cached cards for a whole listing, in order.
+
+        {% item_cards items 'listing' as cards %}
+        {% for card in cards %}{{ card }}{% endfor %}
+    """
+    return render_cards(items, variant)
+
+
+@register.simple_tag
+def item_card(item, variant):
+    """
+    One cached card.
+
+        {% item_card item 'premium' %}
+    """
+    return render_cards([item], variant)[0]
@@ -0,0 +1,41 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from core.images import needs_variants
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f"{default_storage.url(name)} {width}w" for width, name in variants)
+
+
+@register.simple_tag
+def responsive_image(field_file, manifest, sizes='100vw', loading='lazy', **attrs):
+    """
+    Render `field_file` as a <picture> with WebP and JPEG srcsets from its
+    derivative manifest, falling back to the original while none exist yet.
+
+        {% responsive_image item.image item.image_variants sizes="230px" class="item-card-img" alt=item.name %}
+    """
+    if not field_file:
+        return ''
+
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    variants = (manifest or {}).get('variants')
+    if needs_variants(field_file, manifest) or not variants:
+        return format_html('<img src="{}" loading="{}"{}>', field_file.url, loading, extra)
+
+    jpeg = variants['jpeg']
+    # Middle width as the plain src for browsers that ignore srcset
+    fallback = default_storage.url(jpeg[len(jpeg) // 2][1])
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" loading="{}" decoding="async"{}>'
+        '</picture>',
+        _srcset(variants['webp']), sizes,
+        fallback, _srcset(jpeg), sizes,
+        manifest['width'], manifest['height'], loading, extra,
+    )
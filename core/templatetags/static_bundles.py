@@ -0,0 +1,84 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from core.storage import minify_css
+
+register = template.Library()
+
+# Stylesheets live in core/static/core/css and are served as hashed,
+# compressed files (core.storage). On a first visit the page inlines the
+# critical CSS and loads every stylesheet without blocking rendering; a cookie
+# set from the page then marks the bundles as cached, and later pages link
+# them normally.
+
+CRITICAL_CSS = 'core/css/critical.css'
+CACHED_COOKIE = 'css_v'
+CACHED_COOKIE_AGE = 60 * 60 * 24 * 365
+
+
+def _read(path):
+    """`path` as served: the collected, minified copy, or the source minified on the fly."""
+    try:
+        with staticfiles_storage.open(staticfiles_storage.stored_name(path)) as stored:
+            return stored.read().decode('utf-8')
+    except (FileNotFoundError, ValueError):
+        return minify_css(Path(finders.find(path)).read_text(encoding='utf-8'))
+
+
+_read_cached = lru_cache(maxsize=None)(_read)
+
+
+def _version():
+    # Changes whenever collectstatic gives the critical CSS a new hash
+    return hashlib.md5(staticfiles_storage.url(CRITICAL_CSS).encode()).hexdigest()[:8]
+
+
+def _first_visit(context):
+    request = context.get('request')
+    if request is None:
+        return False
+    if not hasattr(request, '_css_first_visit'):
+        request._css_first_visit = request.COOKIES.get(CACHED_COOKIE) != _version()
+    return request._css_first_visit
+
+
+@register.simple_tag(takes_context=True)
+def critical_css(context):
+    """
+    Inline the critical CSS on a first visit, and set the cookie that marks the
+    stylesheets as cached from then on; link it like any other stylesheet after that.
+
+        {% critical_css %}
+    """
+    if not _first_visit(context):
+        return format_html('<link rel="stylesheet" href="{}">', staticfiles_storage.url(CRITICAL_CSS))
+    css = (_read if settings.DEBUG else _read_cached)(CRITICAL_CSS)
+    return format_html(
+        '<style>{}</style><script>document.cookie="{}={}; path=/; max-age={}; samesite=lax";</script>',
+        mark_safe(css), CACHED_COOKIE, _version(), CACHED_COOKIE_AGE,
+    )
+
+
+@register.simple_tag(takes_context=True)
+def stylesheet(context, path):
+    """
+    Link a stylesheet; on a first visit it loads without blocking the first paint.
+
+        {% stylesheet 'core/css/home.css' %}
+    """
+    url = staticfiles_storage.url(path)
+    if not _first_visit(context):
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    return format_html(
+        '<link rel="preload" href="{0}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        '<noscript><link rel="stylesheet" href="{0}"></noscript>',
+        url,
+    )
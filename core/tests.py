@@ -1,3 +1,794 @@
-from django.test import TestCase
+import gc
+import json
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from allauth.socialaccount.models import SocialApp
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+from django.utils import timezone
+
+from . import caching, chat, homepage, jobs, payouts, summaries, wallet
+from .caching import SQLiteCache
+from .management.commands.stress_sqlite import Command as StressSQLite
+from .models import (
+    Category, ChatMessage, Item, Job, LedgerEntry, PayoutRequest, Profile, Referral, Review, ReviewSummary,
+)
+
+# The tests get a private in-memory cache, emptied before each test: the
+# configured one (cache.sqlite3 by default) is shared with any server running
+# from this checkout, and a test must neither read it nor clear it.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CacheIsolatedTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+# --- VIEW BENCHMARKS ---
+#
+# Drives every URL in config/urls.py through the test client against a fixed,
+# seeded dataset and compares query count, p50/p95 latency and response size
+# with core/benchmark_baseline.json. Query counts must not grow at all; time
+# and size get some slack because they depend on the machine. Rewriting the
+# baseline won't raise a query count either, unless the view is named in
+# BENCHMARK_ACCEPT_QUERIES: a view that needs more queries says so in the
+# commit that changes it.
+#
+#   python manage.py test core --tag benchmark                       # check
+#   BENCHMARK_UPDATE=1 python manage.py test core --tag benchmark    # rewrite the baseline
+#   BENCHMARK_UPDATE=1 BENCHMARK_ACCEPT_QUERIES=home,search ...      # ... letting these views' queries grow
+#   python manage.py test core --exclude-tag benchmark               # skip it
+
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+DATASET = {'seed': 7, 'users': 400, 'items': 3000, 'reviews': 30000, 'roots': 6, 'depth': 3, 'fanout': 3}
+ITERATIONS = int(os.environ.get('BENCHMARK_ITERATIONS', 15))
+LATENCY_FACTOR = float(os.environ.get('BENCHMARK_LATENCY_FACTOR', 2.0))   # allowed p50/p95 growth
+LATENCY_SLACK_MS = 20.0                                                   # ignore jitter on fast views
+SIZE_FACTOR = 1.25
+ACCEPT_QUERIES = set(filter(None, os.environ.get('BENCHMARK_ACCEPT_QUERIES', '').split(',')))
+
+
+@tag('benchmark')
+class ViewBenchmarkTests(CacheIsolatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_dataset', stdout=StringIO(), **DATASET)
+
+        google = SocialApp.objects.create(provider='google', name='Google', client_id='benchmark', secret='benchmark')
+        google.sites.add(Site.objects.get_current())
+
+        # The busiest rows, so the numbers reflect the worst pages rather than typical ones
+        cls.user = User.objects.annotate(n=Count('referrals_made')).order_by('-n', 'pk').first()
+        cls.admin = User.objects.create_superuser('bench_admin', 'admin@example.com', 'pass123')
+        cls.item = Item.objects.order_by('-review_count', 'pk').first()
+        cls.category = Category.objects.filter(parent=None).order_by('-subtree_item_count', 'pk').first()
+        cls.review = Review.objects.filter(author=cls.user).order_by('pk').first()
+
+    def cases(self):
+        """(name, method, path, who) for every page; `who` is None, 'user' or 'admin'."""
+        return [
+            ('home', 'get', '/', None),
+            ('home_authenticated', 'get', '/', 'user'),
+            ('register', 'get', '/register/', None),
+            ('login', 'get', '/login/', None),
+            ('logout', 'post', '/logout/', 'user'),
+            ('password_change', 'get', '/settings/password/', 'user'),
+            ('allauth_login', 'get', '/accounts/login/', None),
+            ('accounts_profile', 'get', '/accounts/profile/', 'user'),
+            ('search', 'get', '/search/?query=pro', None),
+            ('search_page_2', 'get', '/search/?query=pro&page=2', None),
+            ('search_empty', 'get', '/search/', None),
+            ('dashboard', 'get', '/dashboard/', 'user'),
+            ('referrals', 'get', '/referrals/', 'user'),
+            ('redeem_tokens', 'get', '/redeem/', 'user'),
+            ('category_list', 'get', '/categories/', None),
+            ('category_detail', 'get', f'/category/{self.category.slug}/', None),
+            ('item_detail', 'get', f'/item/{self.item.slug}/', None),
+            ('item_detail_authenticated', 'get', f'/item/{self.item.slug}/', 'user'),
+            ('add_review', 'get', f'/item/{self.item.slug}/add-review/', 'user'),
+            ('delete_review', 'get', f'/review/delete/{self.review.pk}/', 'user'),
+            ('edit_profile', 'get', '/profile/edit/', 'user'),
+            ('request_payout', 'get', '/payout/request/', 'user'),
+            ('buy_item', 'get', f'/buy/{self.item.slug}/', None),
+            ('about', 'get', '/about/', None),
+            ('contact', 'get', '/contact/', None),
+            ('privacy', 'get', '/privacy/', None),
+            ('terms', 'get', '/terms/', None),
+            ('api_categories', 'get', '/api/v1/categories/', None),
+            ('api_items', 'get', '/api/v1/items/', None),
+            ('api_items_sparse', 'get', f'/api/v1/items/?fields=slug,name,price&category={self.category.slug}', None),
+            ('api_item_detail', 'get', f'/api/v1/items/{self.item.slug}/', None),
+            ('api_item_reviews', 'get', f'/api/v1/items/{self.item.slug}/reviews/', None),
+            ('api_search', 'get', '/api/v1/search/?q=pro', None),
+            ('support_console', 'get', '/support/console/', 'admin'),
+            ('admin_index', 'get', '/admin/', 'admin'),
+            ('admin_items', 'get', '/admin/core/item/', 'admin'),
+            ('admin_reviews', 'get', '/admin/core/review/', 'admin'),
+            ('admin_payouts', 'get', '/admin/core/payoutrequest/', 'admin'),
+            ('admin_ledger', 'get', '/admin/core/ledgerentry/', 'admin'),
+        ]
+
+    def measure(self, method, path, who):
+        users = {'user': self.user, 'admin': self.admin}
+        timings, queries, size, status = [], 0, 0, None
+        gc.collect()
+        gc.disable()  # a collection pause would land on whichever request triggers it
+        try:
+            for iteration in range(ITERATIONS + 1):  # the first request warms caches and isn't counted
+                self.client.logout()
+                if who:
+                    self.client.force_login(users[who])
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(self.client, method)(path)
+                    timings.append((time.perf_counter() - started) * 1000)
+                if iteration:
+                    queries = max(queries, len(captured))
+                size, status = len(response.content), response.status_code
+        finally:
+            gc.enable()
+        timings = timings[1:]
+        return {
+            'status': status,
+            'queries': queries,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(statistics.quantiles(timings, n=20)[18], 2),
+            'bytes': size,
+        }
+
+    def test_every_url_is_benchmarked(self):
+        routes = {resolve(path.split('?')[0]).route for _, _, path, _ in self.cases()}
+        for pattern in get_resolver().url_patterns:
+            prefix = str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                covered = any(route.startswith(prefix) for route in routes)
+            else:
+                covered = prefix in routes
+            self.assertTrue(covered, f"No benchmark case for '{prefix}'")
+
+    def test_views_against_baseline(self):
+        results = {name: self.measure(method, path, who) for name, method, path, who in self.cases()}
+
+        if os.environ.get('BENCHMARK_UPDATE'):
+            old = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {'dataset': None}
+            if old['dataset'] == DATASET:
+                grown = [
+                    f"{name}: {result['queries']} queries, baseline {old['views'][name]['queries']}"
+                    for name, result in results.items()
+                    if name in old['views'] and name not in ACCEPT_QUERIES
+                    and result['queries'] > old['views'][name]['queries']
+                ]
+                self.assertFalse(grown, 'Not rewriting the baseline; name the views in BENCHMARK_ACCEPT_QUERIES '
+                                        'to accept more queries:\n  ' + '\n  '.join(grown))
+            BASELINE_PATH.write_text(json.dumps({'dataset': DATASET, 'views': results}, indent=2) + '\n')
+            return
+
+        self.assertTrue(BASELINE_PATH.exists(), 'No baseline; run with BENCHMARK_UPDATE=1 to create one')
+        baseline = json.loads(BASELINE_PATH.read_text())
+        self.assertEqual(baseline['dataset'], DATASET, 'Baseline was recorded on a different dataset')
+
+        failures = []
+        for name, result in results.items():
+            expected = baseline['views'].get(name)
+            if expected is None:
+                failures.append(f"{name}: not in the baseline")
+                continue
+            if result['status'] != expected['status']:
+                failures.append(f"{name}: status {result['status']}, baseline {expected['status']}")
+            if result['queries'] > expected['queries']:
+                failures.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+            for metric in ('p50_ms', 'p95_ms'):
+                if result[metric] > expected[metric] * LATENCY_FACTOR + LATENCY_SLACK_MS:
+                    failures.append(f"{name}: {metric} {result[metric]}, baseline {expected[metric]}")
+            if result['bytes'] > expected['bytes'] * SIZE_FACTOR:
+                failures.append(f"{name}: {result['bytes']} bytes, baseline {expected['bytes']}")
+
+        self.assertFalse(failures, 'View regressions:\n  ' + '\n  '.join(failures))
+
+
+# --- COUNTER COLUMNS ---
+#
+# Columns moved with F() updates must survive a full save() of an instance
+# that was loaded before they moved.
+
+class ProfileSaveTests(CacheIsolatedTestCase):
+
+    def test_full_save_keeps_ledger_balances(self):
+        user = User.objects.create_user('saver', 'saver@example.com', 'pass123')
+        user.profile  # loaded with a zero balance
+        wallet.credit(user, LedgerEntry.WALLET, 500, 'OPENING')
+        wallet.credit(user, LedgerEntry.TOKENS, 40, 'OPENING')
+        user.save()  # saves the stale profile too (save_profile)
+        user.profile.refresh_from_db()
+        self.assertEqual(user.profile.balance, 500)
+        self.assertEqual(user.profile.token_rewards, 40)
+        self.assertFalse(wallet.drifted_profiles().exists())
+
+    def test_full_save_keeps_counters(self):
+        user = User.objects.create_user('referrer', 'referrer@example.com', 'pass123')
+        profile = Profile.objects.get(user=user)
+        invited = User.objects.create_user('invited', 'invited@example.com', 'pass123')
+        Referral.objects.create(referrer=user, referred_user=invited)  # referral_count += 1
+        profile.image = 'profile_pics/new.jpg'
+        profile.save()
+        profile.refresh_from_db()
+        self.assertEqual(profile.image.name, 'profile_pics/new.jpg')
+        self.assertEqual(profile.referral_count, 1)
+
+    def test_full_save_keeps_image_variants(self):
+        user = User.objects.create_user('pictured', 'pictured@example.com', 'pass123')
+        user.profile  # loaded before its variants exist
+        manifest = {'source': user.profile.image.name, 'variants': {}}
+        Profile.objects.filter(user=user).update(image_variants=manifest)  # what the variants job writes
+        Job.objects.all().delete()
+
+        user.save()  # saves the stale profile too (save_profile)
+        self.assertEqual(Profile.objects.get(user=user).image_variants, manifest)
+        self.assertFalse(Job.objects.exists())
+
+        user.profile.image = 'profile_pics/new.jpg'
+        user.profile.save()
+        self.assertTrue(Job.objects.filter(name='generate_image_variants').exists())
+
+    def test_every_maintained_column_is_left_out_of_full_saves(self):
+        user = User.objects.create_user('columns', 'columns@example.com', 'pass123')
+        with CaptureQueriesContext(connection) as captured:
+            user.profile.save()
+        (update,) = [query['sql'] for query in captured if query['sql'].startswith('UPDATE')]
+        for name in Profile.MAINTAINED_FIELDS:
+            self.assertNotIn(f'"{name}"', update)
+
+
+class ItemAggregateTests(CacheIsolatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Laptops')
+        cls.author = User.objects.create_user('critic', 'critic@example.com', 'pass123')
+
+    def make_item(self, name):
+        return Item.objects.create(category=self.category, name=name, description=name)
+
+    def assertAggregates(self, item, count, total):
+        item.refresh_from_db()
+        self.assertEqual((item.review_count, item.rating_sum), (count, total))
+        self.assertAlmostEqual(item.weighted_rating, (Item.RATING_PRIOR_WEIGHT * Item.RATING_PRIOR_MEAN + total)
+                               / (Item.RATING_PRIOR_WEIGHT + count))
+
+    def test_review_create_edit_move_and_delete(self):
+        first, second = self.make_item('First'), self.make_item('Second')
+        review = Review.objects.create(item=first, author=self.author, rating=4, title='Good', content='Good')
+        self.assertAggregates(first, 1, 4)
+
+        review.rating = 2
+        review.save()
+        self.assertAggregates(first, 1, 2)
+
+        review.item = second
+        review.rating = 5
+        review.save()
+        self.assertAggregates(first, 0, 0)
+        self.assertAggregates(second, 1, 5)
+
+        review.delete()
+        self.assertAggregates(second, 0, 0)
+
+    def test_full_save_keeps_aggregates(self):
+        item = self.make_item('Stale')
+        review = Review.objects.create(item=item, author=self.author, rating=5, title='Great', content='Great')
+        item.name = 'Renamed'
+        item.save()  # loaded before the review was counted
+        self.assertAggregates(item, 1, 5)
+        review.delete()
+        self.assertAggregates(item, 0, 0)
+
+    def test_delete_leaves_drifted_aggregates_alone(self):
+        item = self.make_item('Drifted')
+        review = Review.objects.create(item=item, author=self.author, rating=5, title='Great', content='Great')
+        Item.objects.filter(pk=item.pk).update(rating_sum=3)
+        review.delete()  # would take rating_sum below zero
+        item.refresh_from_db()
+        self.assertEqual((item.review_count, item.rating_sum), (1, 3))
+
+
+class CategoryCountTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        self.root = Category.objects.create(name='Electronics')
+        self.child = Category.objects.create(name='Phones', parent=self.root)
+
+    def counts(self, category):
+        return Category.objects.values_list('item_count', 'subtree_item_count').get(pk=category.pk)
+
+    def test_full_save_keeps_item_counts(self):
+        item = Item.objects.create(category=self.child, name='Pixel', description='Phone')
+        self.root.name = 'Gadgets'
+        self.root.save()  # loaded before the item was counted
+        self.child.save()
+        self.assertEqual(self.counts(self.root), (0, 1))
+        self.assertEqual(self.counts(self.child), (1, 1))
+        item.delete()
+        self.assertEqual(self.counts(self.root), (0, 0))
+        self.assertEqual(self.counts(self.child), (0, 0))
+
+    def test_delete_leaves_drifted_counts_alone(self):
+        item = Item.objects.create(category=self.child, name='Pixel', description='Phone')
+        Category.objects.filter(pk=self.child.pk).update(item_count=0)
+        item.delete()  # would take the child's item_count below zero
+        self.assertEqual(self.counts(self.child), (0, 1))
+        self.assertEqual(self.counts(self.root), (0, 0))
+
+
+# --- WALLET AND PAYOUTS ---
+
+class WalletTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('payee', 'payee@example.com', 'pass123')
+        wallet.credit(self.user, LedgerEntry.WALLET, 500, 'OPENING')
+
+    def profile(self, user=None):
+        return Profile.objects.get(user=user or self.user)
+
+    def payout(self, amount, user=None):
+        return wallet.submit_payout(PayoutRequest(user=user or self.user, amount=amount, bank_name='gtbank'))
+
+    def test_overdraft_books_nothing(self):
+        with self.assertRaises(wallet.InsufficientFunds):
+            wallet.debit(self.user, LedgerEntry.WALLET, 501, 'ADJUSTMENT', 'adjustment:1')
+        with self.assertRaises(wallet.InsufficientFunds):
+            self.payout(600)
+        self.assertEqual(self.profile().balance, 500)
+        self.assertEqual(self.user.ledger_entries.count(), 1)
+        self.assertFalse(PayoutRequest.objects.exists())
+
+    def test_a_reference_is_booked_once(self):
+        wallet.credit(self.user, LedgerEntry.TOKENS, 100, 'REFERRAL_REWARD', 'referral:1')
+        with self.assertRaises(wallet.DuplicateEntry):
+            wallet.credit(self.user, LedgerEntry.TOKENS, 100, 'REFERRAL_REWARD', 'referral:1')
+        self.assertEqual(self.profile().token_rewards, 100)
+        self.assertEqual(self.profile().lifetime_earnings, 600)
+
+    def test_illegal_transitions_are_refused(self):
+        payout = self.payout(100)
+        payout.status = 'PAID'
+        payout.save()
+        payout.status = 'PENDING'
+        with self.assertRaises(ValidationError):
+            payout.clean()
+        with self.assertRaises(ValueError):
+            payout.save()
+        with self.assertRaises(ValueError):
+            payouts.transition(PayoutRequest.objects.all(), 'REFUNDED')
+        self.assertEqual(payouts.transition(PayoutRequest.objects.all(), 'CANCELLED'), [])
+        self.assertEqual(PayoutRequest.objects.get().status, 'PAID')
+        self.assertEqual((self.profile().balance, self.profile().paid_out_total), (400, 100))
+
+    def test_cancelling_refunds_once(self):
+        payout = self.payout(200)
+        self.assertEqual((self.profile().balance, self.profile().pending_payout_total), (300, 200))
+        payout.status = 'CANCELLED'
+        payout.save()
+        self.assertEqual((self.profile().balance, self.profile().pending_payout_total), (500, 0))
+        # Already cancelled: neither the instance nor a batch refunds it again
+        payout.save()
+        self.assertEqual(payouts.transition(PayoutRequest.objects.all(), 'CANCELLED'), [])
+        self.assertEqual(self.profile().balance, 500)
+        self.assertEqual(LedgerEntry.objects.filter(kind='PAYOUT_REFUND').count(), 1)
+
+    def test_batch_transitions_match_the_ledger(self):
+        others = [User.objects.create_user(f'payee{n}', f'payee{n}@example.com', 'pass123') for n in range(3)]
+        for user in others:
+            wallet.credit(user, LedgerEntry.WALLET, 300, 'OPENING')
+        requests = [self.payout(amount, user) for user in [self.user, *others] for amount in (50, 70)]
+
+        payouts.transition(PayoutRequest.objects.all(), 'PROCESSING', chunk_size=3)
+        payouts.transition(PayoutRequest.objects.filter(pk__in=[r.pk for r in requests[::2]]), 'CANCELLED', chunk_size=3)
+        results = payouts.transition(PayoutRequest.objects.all(), 'PAID', chunk_size=3)
+        self.assertEqual(sum(result.moved for result in results), 4)
+
+        for user in [self.user, *others]:
+            profile = self.profile(user)
+            opening = 500 if user == self.user else 300
+            self.assertEqual((profile.balance, profile.pending_payout_total, profile.paid_out_total),
+                             (opening - 70, 0, 70))
+        out = StringIO()
+        call_command('verify_ledger', stdout=out)
+        self.assertIn('All balances match the ledger!', out.getvalue())
+        counters = list(Profile.objects.order_by('pk').values_list(*Profile.MAINTAINED_FIELDS))
+        wallet.rebuild_projection()
+        self.assertEqual(list(Profile.objects.order_by('pk').values_list(*Profile.MAINTAINED_FIELDS)), counters)
+
+
+# --- REVIEW DIGESTS ---
+
+@override_settings(REVIEW_SUMMARY_BACKEND='core.summaries.StubClient')
+class ReviewSummaryTests(CacheIsolatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Headphones')
+        cls.item = Item.objects.create(category=category, name='Buds', description='Earbuds')
+        cls.quiet = Item.objects.create(category=category, name='Cans', description='Over-ear')
+        cls.authors = [User.objects.create_user(f'listener{n}', f'listener{n}@example.com', 'pass123') for n in range(4)]
+
+    def review(self, item, author, rating, title):
+        return Review.objects.create(item=item, author=author, rating=rating, title=title, content=title)
+
+    def test_batch_writes_digests_and_regenerates_only_changed_ones(self):
+        reviews = [self.review(self.item, author, rating, title) for author, rating, title in
+                   zip(self.authors, (5, 4, 1), ('Great bass', 'Comfy', 'Died in a week'))]
+        self.review(self.quiet, self.authors[0], 5, 'Lovely')  # too few reviews to summarize
+
+        self.assertEqual(summaries.summarize_pending(), (1, 0, 0))
+        digest = ReviewSummary.objects.get(item=self.item)
+        self.assertEqual((digest.backend, digest.review_count, digest.stale), ('stub', 3, False))
+        self.assertEqual(digest.pros, ['Comfy', 'Great bass'])  # newest first
+        self.assertEqual(digest.cons, ['Died in a week'])
+        self.assertFalse(ReviewSummary.objects.filter(item=self.quiet).exists())
+        self.assertEqual(summaries.summarize_pending(), (0, 0, 0))  # nothing pending
+
+        reviews[2].rating = 2
+        reviews[2].save()
+        self.assertTrue(ReviewSummary.objects.get(item=self.item).stale)
+        self.assertEqual(summaries.summarize_pending(), (1, 0, 0))
+        self.assertFalse(ReviewSummary.objects.get(item=self.item).stale)
+
+    def test_burst_of_reviews_queues_one_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(self.item, self.authors[0], 5, 'Great bass')
+        with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+            for author in self.authors[1:]:
+                self.review(self.item, author, 4, 'Comfy')
+        self.assertFalse([query for query in captured if 'core_job' in query['sql']])
+        job = Job.objects.get(name='summarize_reviews', status='QUEUED')
+        self.assertGreater(job.run_at, timezone.now() + summaries.BATCH_DELAY - timedelta(minutes=1))
+
+
+# --- CATALOG PAGES ---
+
+class CategoryPageTests(CacheIsolatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name='Audio')
+        child = Category.objects.create(name='Speakers', parent=cls.root)
+        for n in range(30):
+            Item.objects.create(category=child if n % 2 else cls.root, name=f'Speaker {n}', description='Loud')
+        Item.objects.filter(name='Speaker 7').update(weighted_rating=4.5)  # ties are broken by pk
+
+    def test_subtree_is_paged_best_rated_first(self):
+        first = self.client.get(f'/category/{self.root.slug}/')
+        items = list(first.context['items'])
+        self.assertEqual(len(items), 24)
+        self.assertEqual(items[0].name, 'Speaker 7')
+        self.assertContains(first, '?after=')
+
+        second = self.client.get(f'/category/{self.root.slug}/', {'after': first.context['items'].next_cursor})
+        rest = list(second.context['items'])
+        self.assertEqual(len(rest), 6)
+        self.assertFalse(second.context['items'].has_next)
+        self.assertEqual({item.pk for item in items + rest}, set(Item.objects.values_list('pk', flat=True)))
+
+        back = self.client.get(f'/category/{self.root.slug}/', {'before': second.context['items'].previous_cursor})
+        self.assertEqual(list(back.context['items']), items)
+
+    def test_fast_clear_data_invalidates_cached_pages(self):
+        self.assertContains(self.client.get('/categories/'), 'Audio')
+        homepage.build_snapshot()
+        call_command('clear_data', fast=True, keep_media=True, stdout=StringIO())
+        self.assertNotContains(self.client.get('/categories/'), 'Audio')
+        self.assertIsNone(cache.get(homepage.SNAPSHOT_KEY))
+
+
+# --- JSON API ---
+
+class APITests(CacheIsolatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cameras')
+        cls.items = [
+            Item.objects.create(category=cls.category, name=f'Camera {n}', description='Mirrorless', price=100 + n)
+            for n in range(3)
+        ]
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_unchanged_response_is_not_modified(self):
+        response = self.get('/api/v1/items/')
+        self.assertEqual(response.status_code, 200)
+        again = self.get('/api/v1/items/', if_none_match=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_fields_limits_each_object(self):
+        data = self.get('/api/v1/items/?fields=slug,price').json()
+        self.assertEqual(data['results'][0], {'slug': 'camera-2', 'price': '102.00'})
+        detail = self.get(f'/api/v1/items/{self.items[0].slug}/?fields=name').json()
+        self.assertEqual(detail, {'name': 'Camera 0'})
+
+    def test_next_pages_towards_older_rows(self):
+        first = self.get('/api/v1/items/?fields=slug&limit=2').json()
+        self.assertEqual([row['slug'] for row in first['results']], ['camera-2', 'camera-1'])
+        second = self.get(first['next']).json()
+        self.assertEqual([row['slug'] for row in second['results']], ['camera-0'])
+        self.assertIsNone(second['next'])
+        self.assertIsNone(second['newer'])  # only the first page starts a sync
+
+    def test_newer_returns_added_and_edited_rows(self):
+        first = self.get('/api/v1/items/?fields=slug&limit=2').json()
+        self.assertEqual(self.get(first['newer']).json()['results'], [])
+
+        oldest = Item.objects.get(pk=self.items[0].pk)
+        oldest.price = 90
+        oldest.save()  # not on the first page, but edited after it was read
+        Item.objects.create(category=self.category, name='Camera 3', description='Compact')
+        changes = self.get(first['newer']).json()
+        self.assertEqual([row['slug'] for row in changes['results']], ['camera-0', 'camera-3'])
+
+        caught_up = self.get(changes['newer']).json()
+        self.assertEqual(caught_up['results'], [])
+        self.assertEqual(caught_up['newer'], changes['newer'])  # poll the same cursor again
+
+    def test_bad_parameters_are_400s(self):
+        for url in ('/api/v1/items/?fields=slug,colour', '/api/v1/items/?limit=lots',
+                    '/api/v1/items/?since=yesterday', '/api/v1/search/', '/api/v1/search/?q=camera&after=x'):
+            response = self.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('detail', response.json())
+        self.assertEqual(self.get('/api/v1/items/nothing-here/').status_code, 404)
+
+
+# --- REQUEST METRICS ---
+
+@override_settings(SERVER_TIMING_HEADERS=True)
+class RequestMetricsTests(CacheIsolatedTestCase):
+
+    def test_server_timing_reports_template_render(self):
+        timing = self.client.get('/about/')['Server-Timing']
+        template_ms = float(re.search(r'\btemplate;dur=([\d.]+)', timing).group(1))
+        self.assertGreater(template_ms, 0)
+
+
+# --- SUPPORT CHAT ---
+
+class ChatRelayTests(CacheIsolatedTestCase):
+
+    async def test_relays_messages_written_by_other_processes_once(self):
+        user = await User.objects.acreate(username='asker')
+        hub = chat.Hub()
+        writer = chat.MessageWriter(hub)
+        queue = hub.subscribe(f'user:{user.pk}')
+        staff = hub.subscribe(chat.STAFF_CHANNEL)
+        try:
+            await hub.relay_once()  # the first pass only finds the end of the table
+            await ChatMessage.objects.acreate(user=user, message='Typed on another worker')
+            writer.add(ChatMessage(user=user, message='Typed here'))  # published by post_message
+            await writer.flush()
+            await hub.relay_once()
+
+            self.assertEqual(queue.get_nowait()['text'], 'Typed on another worker')
+            self.assertEqual(staff.get_nowait()['username'], 'asker')
+            self.assertTrue(queue.empty())
+            self.assertTrue(staff.empty())
+        finally:
+            await hub.stop()
+
+
+# --- BACKGROUND JOBS ---
+
+class JobQueueTests(CacheIsolatedTestCase):
+
+    @override_settings(EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+                       QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_sent_email_payload_is_cleared(self):
+        mail.send_mail('Reset your password', 'https://example.com/reset/token/', None, ['a@example.com'])
+        job = Job.objects.get(name='send_email')
+        self.assertIn('token', job.payload['message']['body'])
+
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.payload, {})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_prune_removes_only_expired_finished_jobs(self):
+        now = timezone.now()
+        old_done = now - timedelta(seconds=jobs.DONE_RETENTION + 1)
+        recent_dead = now - timedelta(seconds=jobs.DONE_RETENTION + 1)
+        old_dead = now - timedelta(seconds=jobs.DEAD_RETENTION + 1)
+        Job.objects.bulk_create([
+            Job(name='send_email', status='DONE', finished_at=old_done),
+            Job(name='send_email', status='DONE', finished_at=now),
+            Job(name='send_email', status='DEAD', finished_at=recent_dead),
+            Job(name='send_email', status='DEAD', finished_at=old_dead),
+            Job(name='send_email', status='QUEUED'),
+        ])
+        self.assertEqual(jobs.prune(), 2)
+        self.assertEqual(
+            sorted(Job.objects.values_list('status', flat=True)), ['DEAD', 'DONE', 'QUEUED']
+        )
+
+
+# --- SHARED CACHE ---
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.backend()
+
+    def backend(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_get_set_and_delete(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+        self.cache.set('key', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'a': [1, 2]})
+        self.assertTrue(self.cache.has_key('key'))
+        self.assertTrue(self.cache.delete('key'))
+        self.assertFalse(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_entries_are_not_returned(self):
+        self.cache.set('gone', 1, 0)
+        self.cache.set('forever', 2, None)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertFalse(self.cache.has_key('gone'))
+        self.assertFalse(self.cache.touch('gone'))
+        self.assertEqual(self.cache.get_many(['gone', 'forever']), {'forever': 2})
+
+    def test_add_only_replaces_missing_or_expired_entries(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+        self.cache.set('key', 'expired', 0)
+        self.assertTrue(self.cache.add('key', 'third'))
+        self.assertEqual(self.cache.get('key'), 'third')
+
+    def test_many_operations_span_batches(self):
+        self.cache.batch_size = 3
+        self.cache.set_many({f'key{i}': i for i in range(10)})
+        self.assertEqual(self.cache.get_many([f'key{i}' for i in range(12)]), {f'key{i}': i for i in range(10)})
+        self.cache.delete_many([f'key{i}' for i in range(8)])
+        self.assertEqual(self.cache.get_many([f'key{i}' for i in range(10)]), {'key8': 8, 'key9': 9})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['key8', 'key9']), {})
+
+    def test_cull_evicts_soonest_to_expire_first(self):
+        cache = self.backend(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        cache.cull_check_every = 1
+        cache.set('permanent', 0, None)
+        for i in range(10):
+            cache.set(f'key{i}', i, 60 + i)
+        self.assertTrue(cache.has_key('permanent'))
+        self.assertEqual(len(cache.get_many(['permanent', *(f'key{i}' for i in range(10))])), 5)
+        self.assertEqual(cache.get('key9'), 9)
+        self.assertIsNone(cache.get('key0'))
+
+    def test_instances_share_the_file_and_its_connections(self):
+        other = self.backend()
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        self.assertTrue(other.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+        # One thread at a time, so one connection serves them all
+        for _ in range(3):
+            thread = threading.Thread(target=self.backend().get, args=('key',))
+            thread.start()
+            thread.join()
+        self.assertEqual(len(caching._pool(self.path, SQLiteCache.busy_timeout)._idle), 1)
+
+
+# --- HOME PAGE SNAPSHOT ---
+
+class HomeSnapshotTests(CacheIsolatedTestCase):
+
+    def stale_snapshot(self):
+        snapshot = homepage.build_snapshot()
+        snapshot['built_at'] -= timedelta(seconds=settings.HOME_SNAPSHOT_SECONDS + 1)
+        cache.set(homepage.SNAPSHOT_KEY, snapshot)
+        return snapshot['built_at']
+
+    def built_at(self):
+        return cache.get(homepage.SNAPSHOT_KEY)['built_at']
+
+    def test_stale_snapshot_is_served_while_the_worker_rebuilds_it(self):
+        built_at = self.stale_snapshot()
+        homepage.snapshot_context()
+        self.assertEqual(self.built_at(), built_at)
+        self.assertTrue(Job.objects.filter(name=homepage.REBUILD_JOB, status='QUEUED').exists())
+
+    def test_request_rebuilds_when_no_worker_takes_the_job(self):
+        built_at = self.stale_snapshot()
+        jobs.enqueue(homepage.REBUILD_JOB,
+                     run_at=timezone.now() - timedelta(seconds=homepage.WORKER_GRACE_SECONDS + 1))
+        homepage.snapshot_context()
+        self.assertGreater(self.built_at(), built_at)
+
+    def test_periodic_rebuild_reuses_its_job_row(self):
+        homepage.schedule_rebuild()
+        for _ in range(3):
+            Job.objects.filter(name=homepage.REBUILD_JOB).update(run_at=timezone.now())
+            jobs.work(once=True)
+        job = Job.objects.get(name=homepage.REBUILD_JOB)
+        self.assertEqual(job.status, 'QUEUED')
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_rebuild_queued_while_running_takes_over_the_schedule(self):
+        homepage.schedule_rebuild()
+        job = jobs.claim('test')
+        homepage.schedule_rebuild(5)
+        jobs.run(job)
+        self.assertEqual(
+            list(Job.objects.filter(name=homepage.REBUILD_JOB).values_list('status', flat=True).order_by('pk')),
+            ['DONE', 'QUEUED'],
+        )
+
+
+# --- SQLITE TUNING ---
+#
+# The settings are checked here; whether they pay off under concurrent writers
+# is measured by `manage.py stress_sqlite`, and by the benchmark-tagged test,
+# which forks processes and depends on the machine.
+
+class SQLiteTuningTests(TransactionTestCase):
+
+    def setUp(self):
+        if not settings.SQLITE_TUNED:
+            self.skipTest('SQLITE_TUNED is off')
+
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_BUSY_TIMEOUT_MS)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as captured, transaction.atomic():
+            Category.objects.exists()
+        self.assertEqual(captured[0]['sql'], 'BEGIN IMMEDIATE')
+
+    @tag('benchmark')
+    def test_tuned_mode_outwrites_stock_without_lock_errors(self):
+        command = StressSQLite(stdout=StringIO())
+        stock = command.run_mode('stock', writers=4, readers=2, duration=1.5)
+        tuned = command.run_mode('tuned', writers=4, readers=2, duration=1.5)
+        self.assertEqual(tuned['errors'], 0)
+        self.assertGreater(tuned['writes_per_s'], stock['writes_per_s'])
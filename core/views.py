@@ -1,32 +1,52 @@
 import os
 import decimal
-from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q, Avg, Count
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.db import transaction
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.http import HttpResponseRedirect, JsonResponse
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
 from django.conf import settings
-from .models import Item, Category, Review, Profile, Referral, PayoutRequest
+from .models import Item, Category, Review, Profile, Referral, PayoutRequest, ReviewerStats
 from .forms import ReviewForm, UserRegisterForm, ProfileUpdateForm, PayoutRequestForm
+from .conditional import category_page_state, conditional_page, item_page_state
+from .pagination import page_from_request
+from .search import search_items
+from . import caching, homepage, jobs, wallet
+
+# The public read pages (home, items, categories, search, buy) are async views:
+# under ASGI a request waiting on the database or a slow client holds no
+# thread. Templates still read lazy attributes (request.user and its social
+# accounts), the session and the cache, so they render in the request's
+# worker thread, as does anything that only has a sync API.
+async def arender(request, template_name, context=None):
+    return await sync_to_async(render)(request, template_name, context)
+
+async def load_user(request):
+    # Also replaces the lazy request.user, which the template would load again
+    request.user = await request.auser()
+    return request.user
 
 # --- 1. Homepage ---
-def home(request):
-    hero_items = Item.objects.filter(is_featured=True)
-    top_rated = Item.objects.annotate(avg_rating=Avg('reviews__rating')).order_by('-avg_rating')[:4]
-    latest_items = Item.objects.order_by('-created_at')[:4]
-    featured_reviewers = User.objects.annotate(num_reviews=Count('reviews')).filter(num_reviews__gt=0).order_by('-num_reviews')[:4]
-    featured_review = Review.objects.filter(is_featured=True).first()
-    
+async def home(request):
+    leaderboard_window = request.GET.get('leaders')
+    if leaderboard_window not in ReviewerStats.LEADERBOARD_WINDOWS:
+        leaderboard_window = 'all'
+    # Anonymous visitors all see the same page, served from the snapshot (core.homepage)
+    if (await load_user(request)).is_authenticated:
+        snapshot = await sync_to_async(homepage.build_context)(windows=[leaderboard_window])
+    else:
+        snapshot = await sync_to_async(homepage.snapshot_context)()
+
     context = {
-        'hero_items': hero_items, 
-        'top_rated': top_rated,
-        'latest_items': latest_items, 
-        'featured_reviewers': featured_reviewers,
-        'featured_review': featured_review,
+        **snapshot,
+        'featured_reviewers': snapshot['featured_reviewers'][leaderboard_window],
+        'leaderboard_window': leaderboard_window,
     }
-    return render(request, 'core/home.html', context)
+    return await arender(request, 'core/home.html', context)
 
 # --- 2. Registration & Referrals ---
 def register(request):
@@ -42,10 +62,9 @@ def register(request):
             if referrer_name:
                 try:
                     referrer = User.objects.get(username=referrer_name)
-                    Referral.objects.create(referrer=referrer, referred_user=new_user)
-                    profile = referrer.profile
-                    profile.token_rewards += 100
-                    profile.save()
+                    with transaction.atomic():
+                        referral = Referral.objects.create(referrer=referrer, referred_user=new_user)
+                        jobs.enqueue('reward_referral', referral_id=referral.pk)
                     del request.session['referrer']
                 except User.DoesNotExist:
                     pass
@@ -58,26 +77,20 @@ def register(request):
 # --- 3. User Dashboard ---
 @login_required(login_url='/login/')
 def user_dashboard(request):
+    # Totals come from the counters on Profile and both lists are keyset pages,
+    # so the page costs the same few queries however many referrals a user has
     profile = request.user.profile
-    referral_list = Referral.objects.filter(referrer=request.user).order_by('-created_at')
-    ref_paginator = Paginator(referral_list, 5) 
-    ref_page_num = request.GET.get('ref_page')
-    my_referrals = ref_paginator.get_page(ref_page_num)
-    
-    payout_list = PayoutRequest.objects.filter(user=request.user).order_by('-created_at')
-    pay_paginator = Paginator(payout_list, 5) 
-    pay_page_num = request.GET.get('pay_page')
-    my_payouts = pay_paginator.get_page(pay_page_num)
-    
-    vocoin_balance = profile.token_rewards if profile.token_rewards else 0
-    lifetime_total = profile.token_rewards + profile.balance
-    
+    my_referrals = page_from_request(
+        request, Referral.objects.filter(referrer=request.user).select_related('referred_user'), 5, prefix='ref_'
+    )
+    my_payouts = page_from_request(request, PayoutRequest.objects.filter(user=request.user), 5, prefix='pay_')
+
     context = {
         'profile': profile,
         'my_referrals': my_referrals, 
         'my_payouts': my_payouts, 
-        'vocoin_balance': vocoin_balance,
-        'lifetime_total': lifetime_total,
+        'vocoin_balance': profile.token_rewards,
+        'lifetime_total': profile.lifetime_earnings,
     }
     return render(request, 'core/dashboard.html', context)
 
@@ -92,21 +105,15 @@ def redeem_tokens(request):
         try:
             amount_str = request.POST.get('amount')
             amount = decimal.Decimal(amount_str) if amount_str else decimal.Decimal(0)
+            amount = amount.quantize(decimal.Decimal('0.01'))
             
-            if 0 < amount <= profile.token_rewards:
-                profile.token_rewards -= amount
-                profile.balance += amount
-                profile.save()
-                
-                PayoutRequest.objects.create(
-                    user=request.user, 
-                    amount=amount, 
-                    status='PAID'
-                )
+            if amount > 0:
+                wallet.redeem_tokens(request.user, amount)
                 messages.success(request, f"₦{amount} successfully moved to wallet!")
                 return redirect('dashboard')
-            else:
-                messages.error(request, "Insufficient tokens or invalid amount.")
+            messages.error(request, "Insufficient tokens or invalid amount.")
+        except wallet.InsufficientFunds:
+            messages.error(request, "Insufficient tokens or invalid amount.")
         except (decimal.InvalidOperation, ValueError):
             messages.error(request, "Invalid input. Please enter a valid amount.")
             
@@ -126,13 +133,14 @@ def request_payout(request):
             payout = form.save(commit=False)
             payout.user = request.user
             payout.status = 'PENDING'
-            
-            profile.balance -= payout.amount
-            profile.save()
-            
-            payout.save()
-            messages.success(request, "Payout request submitted! Please allow 24-48hrs for processing.")
-            return redirect('dashboard')
+            try:
+                wallet.submit_payout(payout)
+            except wallet.InsufficientFunds:
+                # Another request spent the balance after the form was validated
+                form.add_error('amount', "INSUFFICIENT BALANCE.")
+            else:
+                messages.success(request, "Payout request submitted! Please allow 24-48hrs for processing.")
+                return redirect('dashboard')
     else:
         form = PayoutRequestForm(user_balance=profile.balance)
             
@@ -142,33 +150,34 @@ def request_payout(request):
 @login_required(login_url='/login/')
 def referrals_page(request):
     profile = request.user.profile
-    referral_list = Referral.objects.filter(referrer=request.user).order_by('-created_at')
-    paginator = Paginator(referral_list, 5) 
-    page_number = request.GET.get('page')
-    my_referrals = paginator.get_page(page_number)
+    my_referrals = page_from_request(
+        request, Referral.objects.filter(referrer=request.user).select_related('referred_user'), 5
+    )
     
     context = {
         'my_referrals': my_referrals,
-        'vocoin_balance': profile.token_rewards if profile.token_rewards else 0,
-        'lifetime_total': profile.token_rewards + profile.balance,
+        'referral_count': profile.referral_count,
+        'vocoin_balance': profile.token_rewards,
+        'lifetime_total': profile.lifetime_earnings,
     }
     return render(request, 'core/referrals.html', context)
 
 # --- 7. Items & Reviews ---
-def item_detail(request, slug):
-    item = get_object_or_404(Item, slug=slug)
-    reviews = item.reviews.all().order_by('-created_at')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
+@conditional_page(item_page_state)
+async def item_detail(request, slug):
+    item = await aget_object_or_404(Item.objects.select_related('category', 'summary'), slug=slug)
+    reviews = item.reviews.select_related('author').order_by('-created_at')
     
     referral_link = ""
-    if request.user.is_authenticated:
+    user = await load_user(request)
+    if user.is_authenticated:
         base_url = request.build_absolute_uri().split('?')[0]
-        referral_link = f"{base_url}?ref={request.user.username}"
+        referral_link = f"{base_url}?ref={user.username}"
 
-    return render(request, 'core/item_detail.html', {
+    return await arender(request, 'core/item_detail.html', {
         'item': item, 
         'reviews': reviews, 
-        'avg_rating': avg_rating, 
+        'avg_rating': item.avg_rating, 
         'form': ReviewForm(),
         'referral_link': referral_link 
     })
@@ -189,17 +198,39 @@ def add_review(request, slug):
     return redirect('item_detail', slug=slug)
 
 # --- 8. Helper Views ---
-def search(request):
-    query = request.GET.get('query', '')
-    results = Item.objects.filter(Q(name__icontains=query) | Q(description__icontains=query)) if query else []
-    return render(request, 'core/search_results.html', {'query': query, 'results': results})
+def search_page(query, number):
+    paginator = Paginator(search_items(query) if query else [], 12)
+    return paginator.get_page(number)
+
+async def search(request):
+    query = request.GET.get('query', '').strip()
+    # Full-text search is raw SQL, which has no async API
+    results = await sync_to_async(search_page)(query, request.GET.get('page'))
+    return await arender(request, 'core/search_results.html', {'query': query, 'results': results})
+
+def category_roots():
+    # Invalidated by the 'category' namespace, which core/signals.py bumps on any tree or count change
+    return caching.get_or_compute(
+        caching.namespaced_key('category', 'roots'),
+        lambda: list(Category.objects.filter(parent=None)),
+        settings.CATEGORY_TREE_CACHE_SECONDS,
+    )
 
-def category_list(request):
-    return render(request, 'core/category_list.html', {'categories': Category.objects.filter(parent=None)})
+async def category_list(request):
+    # A miss may wait for another request's rebuild, so the lookup runs in a thread
+    categories = await sync_to_async(category_roots)()
+    return await arender(request, 'core/category_list.html', {'categories': categories})
 
-def category_detail(request, slug):
-    category = get_object_or_404(Category, slug=slug)
-    return render(request, 'core/category_detail.html', {'category': category, 'items': Item.objects.filter(category=category)})
+CATEGORY_PAGE_SIZE = 24
+
+@conditional_page(category_page_state)
+async def category_detail(request, slug):
+    category = await aget_object_or_404(Category, slug=slug)
+    # Best rated first, keyset-paged on (weighted_rating, pk) so a root category never loads the whole catalog
+    items = await sync_to_async(page_from_request)(
+        request, category.subtree_items(), CATEGORY_PAGE_SIZE, field='weighted_rating'
+    )
+    return await arender(request, 'core/category_detail.html', {'category': category, 'items': items})
 
 @login_required(login_url='/login/')
 def edit_profile(request):
@@ -213,8 +244,8 @@ def edit_profile(request):
         form = ProfileUpdateForm(instance=request.user.profile)
     return render(request, 'core/edit_profile.html', {'form': form})
 
-def buy_item(request, slug):
-    item = get_object_or_404(Item, slug=slug)
+async def buy_item(request, slug):
+    item = await aget_object_or_404(Item, slug=slug)
     return HttpResponseRedirect(item.affiliate_link if item.affiliate_link else '/')
 
 @login_required(login_url='/login/')
@@ -229,4 +260,9 @@ def delete_review(request, review_id):
 def about(request): return render(request, 'core/about.html')
 def contact(request): return render(request, 'core/contact.html')
 def privacy(request): return render(request, 'core/privacy.html')
-def terms(request): return render(request, 'core/terms.html')
\ No newline at end of file
+def terms(request): return render(request, 'core/terms.html')
+# --- 10. Support Console ---
+@staff_member_required
+def support_console(request):
+    # Conversations, history and replies all go over the /ws/chat/staff/ socket
+    return render(request, 'core/support_console.html')
@@ -0,0 +1,217 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, Count, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Round
+
+from .models import LedgerEntry, PayoutRequest, Profile, Referral
+
+# Every change to a user's token rewards or wallet balance goes through here.
+# Each movement appends a LedgerEntry and shifts the cached Profile column with
+# a single conditional UPDATE, so concurrent workers never lose an update and
+# a debit can never take a balance below zero.
+
+REFERRAL_REWARD = Decimal('100.00')
+
+ACCOUNT_FIELDS = {
+    LedgerEntry.TOKENS: 'token_rewards',
+    LedgerEntry.WALLET: 'balance',
+}
+
+# Credits of these kinds also count towards Profile.lifetime_earnings
+EARNING_KINDS = ('OPENING', 'REFERRAL_REWARD')
+
+# Which Profile counter a bank payout request's amount sits in, by status
+PAYOUT_TOTAL_FIELDS = {
+    'PENDING': 'pending_payout_total',
+    'PROCESSING': 'pending_payout_total',
+    'PAID': 'paid_out_total',
+}
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+class DuplicateEntry(Exception):
+    """The movement identified by this reference has already been booked."""
+
+
+def reference_for(obj):
+    return f"{obj._meta.model_name}:{obj.pk}"
+
+
+def post(user, account, amount, kind, reference=''):
+    """Book one signed movement on `account`; debits fail rather than overdraw."""
+    field = ACCOUNT_FIELDS[account]
+    amount = Decimal(amount)
+    user_id = getattr(user, 'pk', user)
+
+    try:
+        with transaction.atomic():
+            entry = LedgerEntry.objects.create(
+                user_id=user_id, account=account, kind=kind, amount=amount, reference=reference
+            )
+            profiles = Profile.objects.filter(user_id=user_id)
+            if amount < 0:
+                profiles = profiles.filter(**{f'{field}__gte': -amount})
+            changes = {field: F(field) + amount}
+            if kind in EARNING_KINDS and amount > 0:
+                changes['lifetime_earnings'] = F('lifetime_earnings') + amount
+            if not profiles.update(**changes):
+                raise InsufficientFunds(f"{account} balance is below {-amount}")
+    except IntegrityError:
+        if reference and LedgerEntry.objects.filter(account=account, kind=kind, reference=reference).exists():
+            raise DuplicateEntry(reference)
+        raise
+    return entry
+
+
+def credit(user, account, amount, kind, reference=''):
+    return post(user, account, amount, kind, reference)
+
+
+def debit(user, account, amount, kind, reference=''):
+    return post(user, account, -Decimal(amount), kind, reference)
+
+
+def bulk_credit(account, kind, movements):
+    """
+    Book many credits at once: one INSERT for the entries and one UPDATE for
+    the balances. `movements` is a list of (user_id, amount, reference); must
+    be called inside a transaction.
+    """
+    if not movements:
+        return 0
+    field = ACCOUNT_FIELDS[account]
+
+    LedgerEntry.objects.bulk_create([
+        LedgerEntry(user_id=user_id, account=account, kind=kind, amount=amount, reference=reference)
+        for user_id, amount, reference in movements
+    ])
+
+    totals = _per_user(movements)
+    add_to_profiles(field, totals)
+    if kind in EARNING_KINDS:
+        add_to_profiles('lifetime_earnings', {user_id: total for user_id, total in totals.items() if total > 0})
+    return len(movements)
+
+
+def _per_user(rows):
+    totals = defaultdict(Decimal)
+    for user_id, amount, *_ in rows:
+        totals[user_id] += Decimal(amount)
+    return totals
+
+
+def add_to_profiles(field, totals):
+    """Add per-user amounts ({user_id: amount}) to one Profile column in a single UPDATE."""
+    if not totals:
+        return 0
+    return Profile.objects.filter(user_id__in=totals).update(**{
+        field: F(field) + Case(
+            *[When(user_id=user_id, then=Value(total)) for user_id, total in totals.items()],
+            default=Value(Decimal('0.00')),
+            output_field=MONEY,
+        )
+    })
+
+
+def move_payout_totals(payouts, old_status, new_status):
+    """Shift (user_id, amount) bank payouts between the pending and paid-out counters."""
+    old_field, new_field = PAYOUT_TOTAL_FIELDS.get(old_status), PAYOUT_TOTAL_FIELDS.get(new_status)
+    if old_field == new_field:
+        return
+    totals = _per_user(payouts)
+    if old_field:
+        add_to_profiles(old_field, {user_id: -total for user_id, total in totals.items()})
+    if new_field:
+        add_to_profiles(new_field, totals)
+
+
+# --- USE CASES ---
+
+def reward_referral(referral):
+    try:
+        return credit(referral.referrer, LedgerEntry.TOKENS, REFERRAL_REWARD, 'REFERRAL_REWARD', reference_for(referral))
+    except DuplicateEntry:
+        return None
+
+
+def redeem_tokens(user, amount):
+    """Move tokens into the spendable wallet, recorded as an already-paid request."""
+    with transaction.atomic():
+        record = PayoutRequest.objects.create(user=user, amount=amount, status='PAID')
+        reference = reference_for(record)
+        debit(user, LedgerEntry.TOKENS, amount, 'REDEMPTION', reference)
+        credit(user, LedgerEntry.WALLET, amount, 'REDEMPTION', reference)
+    return record
+
+
+def submit_payout(payout):
+    """Save a new bank payout request and take its amount out of the wallet."""
+    with transaction.atomic():
+        payout.save()
+        debit(payout.user_id, LedgerEntry.WALLET, payout.amount, 'PAYOUT', reference_for(payout))
+        move_payout_totals([(payout.user_id, payout.amount)], None, payout.status)
+    return payout
+
+
+def refund_payout(payout):
+    try:
+        return credit(payout.user_id, LedgerEntry.WALLET, payout.amount, 'PAYOUT_REFUND', reference_for(payout))
+    except DuplicateEntry:
+        return None
+
+
+# --- PROJECTION ---
+
+def _user_total(queryset, column='amount'):
+    """Per-profile SUM over `queryset` (already filtered to user=OuterRef('user')) as an expression."""
+    totals = queryset.order_by().values('user').annotate(total=Sum(column)).values('total')
+    return Coalesce(Subquery(totals, output_field=MONEY), Value(Decimal('0.00')), output_field=MONEY)
+
+
+def _ledger_total(account):
+    return _user_total(LedgerEntry.objects.filter(user=OuterRef('user'), account=account))
+
+
+def _bank_payout_total(statuses):
+    # Bank payouts are the requests whose amount left the wallet as a PAYOUT
+    # entry; token redemptions are also stored as (PAID) requests, but aren't one
+    debited = LedgerEntry.objects.filter(
+        account=LedgerEntry.WALLET, kind='PAYOUT',
+        reference=Concat(Value(f'{PayoutRequest._meta.model_name}:'), Cast(OuterRef('pk'), CharField())),
+    )
+    return _user_total(PayoutRequest.objects.filter(Exists(debited), user=OuterRef('user'), status__in=statuses))
+
+
+def drifted_profiles():
+    """Profiles whose cached balances disagree with the ledger, annotated with the ledger values."""
+    # Compared at cent precision: SQLite sums decimals as floating point
+    return Profile.objects.annotate(
+        ledger_tokens=Round(_ledger_total(LedgerEntry.TOKENS), 2),
+        ledger_balance=Round(_ledger_total(LedgerEntry.WALLET), 2),
+        cached_tokens=Round('token_rewards', 2),
+        cached_balance=Round('balance', 2),
+    ).filter(~Q(cached_tokens=F('ledger_tokens')) | ~Q(cached_balance=F('ledger_balance')))
+
+
+def rebuild_projection():
+    """Recompute every Profile balance and dashboard counter from the ledger in one UPDATE."""
+    referrals = Referral.objects.filter(referrer=OuterRef('user')).order_by().values('referrer').annotate(n=Count('pk'))
+    statuses = defaultdict(list)
+    for status, field in PAYOUT_TOTAL_FIELDS.items():
+        statuses[field].append(status)
+    return Profile.objects.update(
+        token_rewards=_ledger_total(LedgerEntry.TOKENS),
+        balance=_ledger_total(LedgerEntry.WALLET),
+        lifetime_earnings=_user_total(
+            LedgerEntry.objects.filter(user=OuterRef('user'), kind__in=EARNING_KINDS, amount__gt=0)
+        ),
+        referral_count=Coalesce(Subquery(referrals.values('n')), Value(0)),
+        **{field: _bank_payout_total(field_statuses) for field, field_statuses in statuses.items()},
+    )